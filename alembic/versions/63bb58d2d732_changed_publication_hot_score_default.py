@@ -0,0 +1,42 @@
+"""changed publication hot_score default
+
+Revision ID: 63bb58d2d732
+Revises: 4fac16c42c88
+Create Date: 2026-10-19 13:57:04.444046
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '63bb58d2d732'
+down_revision = '4fac16c42c88'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'publications', 'hot_score',
+        existing_type=sa.Float(),
+        server_default=sa.text('(extract(epoch from localtimestamp) - 1704067200) / 45000'),
+        existing_nullable=False,
+    )
+    # rows without votes still hold the old default, votes recompute the others
+    op.execute(
+        """
+        UPDATE publications
+        SET hot_score = (extract(epoch from created_at) - 1704067200) / 45000
+        WHERE upvotes = 0 AND downvotes = 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'publications', 'hot_score',
+        existing_type=sa.Float(),
+        server_default=sa.text('(extract(epoch from now()) - 1704067200) / 45000'),
+        existing_nullable=False,
+    )
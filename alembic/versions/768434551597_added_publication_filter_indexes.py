@@ -0,0 +1,39 @@
+"""added publication filter indexes
+
+Revision ID: 768434551597
+Revises: c945192d2e05
+Create Date: 2026-10-19 12:47:59.476101
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '768434551597'
+down_revision = 'c945192d2e05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_publications_created_at', 'publications', ['created_at'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_publications_creator_id_created_at', 'publications', ['creator_id', 'created_at'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_publications_creator_id_created_at', table_name='publications',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_publications_created_at', table_name='publications', postgresql_concurrently=True,
+        )
@@ -0,0 +1,34 @@
+"""added publication deleted_at
+
+Revision ID: afaf7cffccba
+Revises: dba5b948f26d
+Create Date: 2026-10-19 13:08:22.099910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'afaf7cffccba'
+down_revision = 'dba5b948f26d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # a nullable column without a default only changes the catalog
+    op.add_column('publications', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_publications_deleted_at', 'publications', ['deleted_at'], unique=False,
+            postgresql_where=sa.text('deleted_at IS NOT NULL'), postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_publications_deleted_at', table_name='publications', postgresql_concurrently=True,
+        )
+    op.drop_column('publications', 'deleted_at')
@@ -0,0 +1,63 @@
+"""added publication search vector
+
+Revision ID: c945192d2e05
+Revises: 2691091769ef
+Create Date: 2026-10-19 12:45:09.969572
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c945192d2e05'
+down_revision = '2691091769ef'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    # A generated column would rewrite the whole table under an exclusive
+    # lock. A plain nullable column is added instantly instead and kept in
+    # sync by a trigger, see SEARCH_CONFIG in src.publications.constants.
+    op.add_column('publications', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(
+        """
+        CREATE TRIGGER publications_search_vector
+        BEFORE INSERT OR UPDATE OF content ON publications
+        FOR EACH ROW EXECUTE FUNCTION
+        tsvector_update_trigger(search_vector, 'pg_catalog.english', content)
+        """
+    )
+
+    # rows written from now on are covered by the trigger, fill the rest in
+    # short transactions and build the index without blocking writes
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = bind.scalar(sa.text("SELECT coalesce(max(id), 0) FROM publications"))
+        for after in range(0, last_id, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(
+                    "UPDATE publications SET search_vector = to_tsvector('english', content) "
+                    "WHERE id > :after AND id <= :after + :size AND search_vector IS NULL"
+                ),
+                {"after": after, "size": BACKFILL_BATCH_SIZE},
+            )
+        op.execute("ANALYZE publications")
+        op.create_index(
+            'ix_publications_search_vector', 'publications', ['search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_publications_search_vector', table_name='publications',
+            postgresql_concurrently=True,
+        )
+    op.execute("DROP TRIGGER publications_search_vector ON publications")
+    op.drop_column('publications', 'search_vector')
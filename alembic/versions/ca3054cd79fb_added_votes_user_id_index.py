@@ -0,0 +1,30 @@
+"""added votes user_id index
+
+Revision ID: ca3054cd79fb
+Revises: b1a6b3a384ea
+Create Date: 2026-10-19 12:38:16.667205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ca3054cd79fb'
+down_revision = 'b1a6b3a384ea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # votes is the largest table, build the index without blocking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_votes_user_id_id', 'votes', ['user_id', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_votes_user_id_id', table_name='votes', postgresql_concurrently=True)
@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def metadata() -> dict:
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "n": len(values),
+        "min": min(values, default=0.0),
+        "median": statistics.median(values) if values else 0.0,
+        "p95": percentile(values, 95),
+        "max": max(values, default=0.0),
+    }
+
+
+def write_results(results: dict, output: str | None) -> None:
+    data = json.dumps({"meta": metadata(), **results}, indent=2, default=str)
+    if output in (None, "-"):
+        sys.stdout.write(data + "\n")
+        return
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data + "\n")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn(workers: int, **env: str):
+    """Run the production gunicorn setup on a free local port.
+
+    Yields the process (stderr piped) and the port it is bound to.
+    """
+    port = free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "-k", "uvicorn.workers.UvicornWorker",
+            "-c", "gunicorn/gunicorn_conf.py",
+            "src.main:app",
+        ],
+        cwd=BASE_DIR,
+        env={
+            **os.environ,
+            "WEB_CONCURRENCY": str(workers),
+            "BIND": f"127.0.0.1:{port}",
+            **env,
+        },
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        yield proc, port
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
@@ -0,0 +1,256 @@
+"""Lock waits of concurrent voters piling onto a few viral publications.
+
+    python -m benchmarks.contention --shards 0 8 --concurrency 32 --duration 10
+    python -m benchmarks.contention --publications 50 --alpha 2 -o contention.json
+
+Every voter casts and takes back votes with the statements of the vote use
+cases (without the live counts published after commit), choosing publications from
+a power law so that most votes hit the same few rows. Meanwhile a separate
+connection samples pg_stat_activity for backends waiting on a lock. Each
+``--shards`` value is one run with VOTE_COUNTER_SHARDS set to it, against
+the configured, migrated database; the stored totals must equal the votes
+once the shards are compacted. The rows a run creates are removed after it.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import percentile, write_results
+
+SAMPLE_SECONDS = 0.005
+
+LOCK_WAITS = text(
+    "SELECT wait_event FROM pg_stat_activity "
+    "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+)
+
+
+async def setup(session_factory, voters: int, publications: int) -> tuple[list, list]:
+    from src.publications.models import Publication
+    from src.users.models import User
+
+    run_id = uuid.uuid4().hex[:8]
+    async with session_factory() as session:
+        users = [
+            User(username=f"contention_{run_id}_{i}", password=b"")
+            for i in range(voters)
+        ]
+        session.add_all(users)
+        await session.flush()
+        pubs = [
+            Publication(content=f"contention {run_id} #{i}", creator_id=users[0].id)
+            for i in range(publications)
+        ]
+        session.add_all(pubs)
+        await session.commit()
+    return [user.id for user in users], [pub.id for pub in pubs]
+
+
+async def cleanup(session_factory, user_ids: list, publication_ids: list) -> None:
+    from src.outbox.models import OutboxEvent
+    from src.publications.constants import VOTE_CREATED, VOTE_REMOVED
+    from src.publications.models import Publication, PublicationVoteBucket, Vote
+    from src.users.models import User
+
+    async with session_factory() as session:
+        await session.execute(
+            delete(OutboxEvent).where(
+                OutboxEvent.event_type.in_([VOTE_CREATED, VOTE_REMOVED]),
+                OutboxEvent.aggregate_id.in_(publication_ids),
+            )
+        )
+        await session.execute(
+            delete(Vote).where(Vote.publication_id.in_(publication_ids))
+        )
+        await session.execute(
+            delete(PublicationVoteBucket)
+            .where(PublicationVoteBucket.publication_id.in_(publication_ids))
+        )
+        await session.execute(
+            delete(Publication).where(Publication.id.in_(publication_ids))
+        )
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def vote(session_factory, user_id: int, publication_id: int, voted: bool) -> None:
+    """The transaction of VotedForPublication, or of RemoveUserVoteForPublication."""
+    from src.outbox import service as outbox
+    from src.publications import service
+    from src.publications.constants import VOTE_CREATED, VOTE_REMOVED
+
+    async with session_factory() as session:
+        if voted:
+            removed = await service.remove_vote(session, user_id, publication_id)
+            grade, shift, event_type = removed.grade, -1, VOTE_REMOVED
+        else:
+            # the use case's checks, both plain reads
+            await service.get_publication_by_id(session, publication_id)
+            await service.get_vote(session, user_id, publication_id)
+            await service.create_vote(session, user_id, publication_id, grade=True)
+            grade, shift, event_type = True, 1, VOTE_CREATED
+        await service.update_vote_totals(
+            session, publication_id,
+            upvotes=shift * int(grade), downvotes=shift * int(not grade),
+        )
+        await service.record_vote_activity(session, publication_id, votes=shift)
+        await outbox.add_event(
+            session, event_type, publication_id,
+            publication_id=publication_id, user_id=user_id, grade=grade,
+        )
+        await service.mark_score_stale(session, publication_id)
+        await service.bump_listing_version_for_vote(session)
+        await session.commit()
+
+
+async def voter(
+        session_factory, user_id: int, publication_ids: list, cum_weights: list,
+        rng: random.Random, deadline: float, latencies: list,
+) -> None:
+    voted = set()
+    while time.perf_counter() < deadline:
+        publication_id = rng.choices(publication_ids, cum_weights=cum_weights)[0]
+        started = time.perf_counter()
+        await vote(session_factory, user_id, publication_id, publication_id in voted)
+        latencies.append(time.perf_counter() - started)
+        voted ^= {publication_id}
+
+
+async def sample_lock_waits(engine, stop: asyncio.Event) -> dict:
+    samples, waiting, events = 0, [], Counter()
+    async with engine.connect() as conn:
+        while not stop.is_set():
+            rows = (await conn.execute(LOCK_WAITS)).scalars().all()
+            await conn.rollback()  # the activity view is a per-transaction snapshot
+            samples += 1
+            waiting.append(len(rows))
+            events.update(rows)
+            await asyncio.sleep(SAMPLE_SECONDS)
+    return {
+        "samples": samples,
+        "mean_waiting": sum(waiting) / max(samples, 1),
+        "max_waiting": max(waiting, default=0),
+        "sampled_with_waits": sum(1 for n in waiting if n) / max(samples, 1),
+        "by_event": dict(events),
+    }
+
+
+async def check_totals(session_factory, publication_ids: list) -> dict:
+    """Fold the shards, then compare the stored totals with the votes."""
+    from src.publications.models import Publication, Vote
+    from src.publications.service import compact_vote_shards
+
+    async with session_factory() as session:
+        await session.run_sync(compact_vote_shards)
+        stored = await session.execute(
+            select(Publication.id, Publication.upvotes + Publication.downvotes)
+            .where(Publication.id.in_(publication_ids))
+        )
+        counted = await session.execute(
+            select(Vote.publication_id, func.count())
+            .where(Vote.publication_id.in_(publication_ids))
+            .group_by(Vote.publication_id)
+        )
+    counted = dict(counted.all())
+    mismatched = [id_ for id_, total in stored.all() if total != counted.get(id_, 0)]
+    return {"votes": sum(counted.values()), "mismatched": mismatched}
+
+
+async def run(args: argparse.Namespace, shards: int) -> dict:
+    from src.config import settings
+
+    settings.VOTE_COUNTER_SHARDS = shards
+    engine = create_async_engine(
+        settings.get_db_url(), pool_size=args.concurrency + 1, max_overflow=0
+    )
+    session_factory = async_sessionmaker(
+        bind=engine, expire_on_commit=False, autoflush=False
+    )
+    user_ids, publication_ids = await setup(
+        session_factory, args.concurrency, args.publications
+    )
+    try:
+        cum_weights, total = [], 0.0
+        for rank in range(len(publication_ids)):
+            total += (rank + 1) ** -args.alpha
+            cum_weights.append(total)
+
+        latencies = [[] for _ in user_ids]
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_lock_waits(engine, stop))
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            voter(
+                session_factory, user_id, publication_ids, cum_weights,
+                random.Random(args.seed + i), deadline, latencies[i],
+            )
+            for i, user_id in enumerate(user_ids)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        lock_waits = await sampler
+
+        values = [v for per_voter in latencies for v in per_voter]
+        result = {
+            "shards": shards,
+            "votes": len(values),
+            "votes_per_s": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "hottest_share": cum_weights[0] / cum_weights[-1],
+            "lock_waits": lock_waits,
+            "totals": await check_totals(session_factory, publication_ids),
+        }
+    finally:
+        await cleanup(session_factory, user_ids, publication_ids)
+        await engine.dispose()
+    return result
+
+
+async def run_all(args: argparse.Namespace) -> list[dict]:
+    results = []
+    for shards in args.shards:
+        result = await run(args, shards)
+        print(
+            f"shards={shards:<3} {result['votes_per_s']:8.1f} votes/s  "
+            f"p95 {result['p95_ms']:7.1f}ms  "
+            f"{result['lock_waits']['mean_waiting']:5.2f} backends waiting on locks "
+            f"{result['lock_waits']['by_event']}",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 8],
+                        help="VOTE_COUNTER_SHARDS of each run, 0 updates the "
+                             "publication row")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="voters, one connection each")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--publications", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=1.5,
+                        help="power law exponent of the publication picked by a vote")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file, stdout by default")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_all(args))
+    write_results({"config": vars(args), "runs": results}, args.output)
+    return 1 if any(run["totals"]["mismatched"] for run in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
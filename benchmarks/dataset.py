@@ -0,0 +1,256 @@
+"""Deterministic synthetic users, publications and votes loaded with COPY.
+
+    python -m benchmarks.dataset --users 100000 --publications 1000000 \\
+        --votes 10000000 --seed 42 --truncate
+
+Votes per publication follow a power law, a few creators write most of the
+publications, and ``created_at`` is spread over ``--days`` before ``--end``.
+The same spec and seed always produce the same rows, so benchmarks and plan
+tests can share datasets. Every generated user has the password
+``DEFAULT_PASSWORD``.
+"""
+import argparse
+import itertools
+import random
+import string
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Iterator
+
+import bcrypt
+
+DEFAULT_PASSWORD = "dataset-Pass-1!"
+
+WORDS = (
+    "travel tour guide city museum river mountain lake beach sunset food market "
+    "street history castle bridge church night walk bike boat island village "
+    "forest park garden wine coffee festival music art photo trip route day "
+    "weekend family kids local hidden best view old new great small quiet"
+).split()
+
+# every table a run fills; change_versions keeps the row its migration seeds
+TABLES = (
+    "votes",
+    "publication_vote_shards",
+    "publication_vote_buckets",
+    "publication_scores",
+    "stale_publication_scores",
+    "publications",
+    "outbox_events",
+    "user_stats",
+    "stale_user_stats",
+    "blacklisted_tokens",
+    "users",
+)
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    users: int = 10_000
+    publications: int = 100_000
+    votes: int = 1_000_000
+    seed: int = 42
+    vote_alpha: float = 1.1  # exponent of the votes-per-publication power law
+    creator_alpha: float = 1.2  # skew of publications per creator
+    upvote_ratio: float = 0.7
+    days: int = 365
+    end: datetime = datetime(2024, 1, 1)
+    content_words: int = 40
+
+
+def _power_law_cum_weights(size: int, alpha: float) -> list[float]:
+    return list(itertools.accumulate((rank + 1) ** -alpha for rank in range(size)))
+
+
+def _bcrypt_salt(rng: random.Random) -> bytes:
+    alphabet = "./" + string.ascii_uppercase + string.ascii_lowercase + string.digits
+    # the last character only carries 2 bits, keep it canonical
+    body = "".join(rng.choices(alphabet, k=21)) + "."
+    return f"$2b$12${body}".encode()
+
+
+class DatasetGenerator:
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+
+    def users(self) -> Iterator[tuple]:
+        password = bcrypt.hashpw(DEFAULT_PASSWORD.encode(), _bcrypt_salt(self.rng))
+        for user_id in range(1, self.spec.users + 1):
+            yield user_id, f"user{user_id}", password, False
+
+    def publications(self) -> Iterator[tuple]:
+        spec, rng = self.spec, self.rng
+        creators = list(range(1, spec.users + 1))
+        rng.shuffle(creators)
+        creator_ids = rng.choices(
+            creators,
+            cum_weights=_power_law_cum_weights(len(creators), spec.creator_alpha),
+            k=spec.publications,
+        )
+        start = spec.end - timedelta(days=spec.days)
+        span = spec.days * 86400
+        offsets = sorted(rng.random() * span for _ in range(spec.publications))
+
+        for pub_id, (offset, creator_id) in enumerate(
+                zip(offsets, creator_ids), start=1
+        ):
+            created_at = start + timedelta(seconds=offset)
+            length = rng.randint(spec.content_words // 2, spec.content_words * 2)
+            words = rng.choices(WORDS, k=length)
+            yield pub_id, " ".join(words), created_at, created_at, creator_id
+
+    def vote_counts(self) -> list[int]:
+        """Votes each publication gets, power-law distributed over a shuffled order."""
+        spec = self.spec
+        weights = [(rank + 1) ** -spec.vote_alpha for rank in range(spec.publications)]
+        suffix = list(itertools.accumulate(reversed(weights)))[::-1] + [0.0]
+        target = min(spec.votes, spec.users * spec.publications)
+
+        # Nobody can vote twice, so the head of the distribution is capped at
+        # the number of users and its surplus is spread over the tail.
+        capped, share = 0, 0.0
+        while capped < spec.publications:
+            share = (target - spec.users * capped) / suffix[capped]
+            if weights[capped] * share <= spec.users:
+                break
+            capped += 1
+        exact = [spec.users] * capped + [w * share for w in weights[capped:]]
+
+        counts = [int(c) for c in exact]
+        by_remainder = sorted(range(len(exact)), key=lambda i: counts[i] - exact[i])
+        for i in by_remainder[:target - sum(counts)]:
+            counts[i] += 1
+        self.rng.shuffle(counts)
+        return counts
+
+    def votes(self) -> Iterator[tuple]:
+        spec, rng = self.spec, self.rng
+        vote_id = itertools.count(1)
+        for pub_id, count in enumerate(self.vote_counts(), start=1):
+            for user_id in rng.sample(range(1, spec.users + 1), count):
+                yield next(vote_id), pub_id, user_id, rng.random() < spec.upvote_ratio
+
+
+def _copy(cursor, table: str, columns: tuple[str, ...], rows: Iterator[tuple]) -> int:
+    count = 0
+    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+def _derived_scores_sql() -> str:
+    """The scores the vote use cases maintain, recomputed for every row."""
+    from sqlalchemy import update
+    from sqlalchemy.dialects import postgresql
+    from src.publications.models import Publication
+    from src.publications.service import hot_score, wilson_lower_bound
+
+    stmt = update(Publication).values(
+        hot_score=hot_score(
+            Publication.upvotes - Publication.downvotes, Publication.created_at
+        ),
+        best_score=wilson_lower_bound(Publication.upvotes, Publication.downvotes),
+        updated_at=Publication.updated_at,
+    )
+    return str(stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+
+def load_dataset(
+        connection, spec: DatasetSpec, truncate: bool = False
+) -> dict[str, int]:
+    """Fill empty tables on a psycopg ``connection`` and commit.
+
+    Rows are generated lazily and streamed through COPY, so memory use does
+    not grow with the target scale.
+    """
+    generator = DatasetGenerator(spec)
+    with connection.cursor() as cursor:
+        if truncate:
+            cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        for table in ("users", "publications", "votes"):
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+            if cursor.fetchone()[0]:
+                raise RuntimeError(f"table {table} is not empty, pass truncate=True")
+
+        loaded = {
+            "users": _copy(
+                cursor, "users", ("id", "username", "password", "is_admin"),
+                generator.users(),
+            ),
+            "publications": _copy(
+                cursor, "publications",
+                ("id", "content", "created_at", "updated_at", "creator_id"),
+                generator.publications(),
+            ),
+            "votes": _copy(
+                cursor, "votes", ("id", "publication_id", "user_id", "grade"),
+                generator.votes(),
+            ),
+        }
+        for table in ("users", "publications", "votes"):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT coalesce(max(id), 0) + 1 FROM {table}), false)"
+            )
+        # COPY skips the vote use cases, so derive the stored totals here
+        cursor.execute(
+            "UPDATE publications p SET upvotes = v.upvotes, downvotes = v.downvotes "
+            "FROM (SELECT publication_id, count(*) FILTER (WHERE grade) AS upvotes, "
+            "count(*) FILTER (WHERE NOT grade) AS downvotes "
+            "FROM votes GROUP BY publication_id) v WHERE v.publication_id = p.id"
+        )
+        cursor.execute(_derived_scores_sql())
+    connection.commit()
+    with connection.cursor() as cursor:
+        for table in ("users", "publications", "votes"):
+            cursor.execute(f"ANALYZE {table}")
+    connection.commit()
+    return loaded
+
+
+def main() -> int:
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--publications", type=int, default=defaults.publications)
+    parser.add_argument("--votes", type=int, default=defaults.votes)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--vote-alpha", type=float, default=defaults.vote_alpha)
+    parser.add_argument("--creator-alpha", type=float, default=defaults.creator_alpha)
+    parser.add_argument("--upvote-ratio", type=float, default=defaults.upvote_ratio)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=defaults.end)
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the tables first")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(**{
+        k: v for k, v in vars(args).items() if k in DatasetSpec.__dataclass_fields__
+    })
+
+    from src.database.engine import sync_engine
+
+    started = time.perf_counter()
+    raw = sync_engine.raw_connection()
+    try:
+        loaded = load_dataset(raw.driver_connection, spec, truncate=args.truncate)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        raw.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"loaded {loaded} in {elapsed:.1f}s from {asdict(spec)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
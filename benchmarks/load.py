@@ -0,0 +1,327 @@
+"""HTTP load test of the public API with JSON baselines.
+
+Run against an app that is already up, or let the harness migrate the
+configured database and boot gunicorn itself:
+
+    python -m benchmarks.load run --boot --duration 30 --concurrency 32
+    python -m benchmarks.load run --url http://127.0.0.1:8000 -o results.json
+    python -m benchmarks.load run --boot --save-baseline
+    python -m benchmarks.load compare results.json --tolerance 0.15
+
+``compare`` exits with 1 when an endpoint's p95 latency grew, or its
+throughput dropped, by more than the tolerance relative to the baseline.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import httpx
+
+from benchmarks.common import (
+    BASE_DIR,
+    BASELINES_DIR,
+    gunicorn,
+    percentile,
+    write_results,
+)
+
+BASELINE_FILE = BASELINES_DIR / "load.json"
+PASSWORD = "load-Test-1!"
+
+# Relative weights of the traffic mix, roughly what the frontend produces.
+DEFAULT_MIX = {
+    "login": 2,
+    "refresh": 3,
+    "list_rating": 40,
+    "list_created_at": 25,
+    "vote_create": 12,
+    "vote_update": 10,
+    "vote_remove": 8,
+}
+
+
+@dataclass
+class VirtualUser:
+    username: str
+    access_token: str = ""
+    refresh_token: str = ""
+    votes: dict[int, bool] = field(default_factory=dict)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def add(self, name: str, elapsed: float, ok: bool) -> None:
+        self.latencies[name].append(elapsed)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / duration,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "duration_s": duration,
+            "total": {
+                "count": total,
+                "errors": sum(self.errors.values()),
+                "rps": total / duration,
+            },
+            "endpoints": endpoints,
+        }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, int], seed: int):
+        self.client = client
+        self.mix = mix
+        self.random = random.Random(seed)
+        self.recorder = Recorder()
+        self.publication_ids: list[int] = []
+
+    async def _call(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        resp = await self.client.request(method, url, **kwargs)
+        self.recorder.add(name, time.perf_counter() - started, resp.is_success)
+        return resp
+
+    async def login(self, user: VirtualUser, name: str = "login") -> None:
+        resp = await self._call(
+            name, "POST", "/auth/token",
+            json={"username": user.username, "password": PASSWORD},
+        )
+        if resp.is_success:
+            tokens = resp.json()["details"]
+            user.access_token = tokens["access_token"]
+            user.refresh_token = tokens["refresh_token"]
+
+    async def refresh(self, user: VirtualUser) -> None:
+        resp = await self._call(
+            "refresh", "POST", "/auth/token/refresh",
+            json={"refresh_token": user.refresh_token},
+        )
+        if resp.is_success:
+            tokens = resp.json()["details"]
+            user.access_token = tokens["access_token"]
+            user.refresh_token = tokens["refresh_token"]
+        else:
+            await self.login(user, name="login")
+
+    async def list_publications(self, order_by: str) -> None:
+        await self._call(
+            f"list_{order_by}", "GET", "/publications",
+            params={"order_by": order_by, "desc": True, "limit": 10},
+        )
+
+    async def vote(self, user: VirtualUser, action: str) -> None:
+        if action != "vote_create" and not user.votes:
+            action = "vote_create"
+        if action == "vote_create":
+            sample = self.random.sample(
+                self.publication_ids, min(8, len(self.publication_ids))
+            )
+            candidates = [i for i in sample if i not in user.votes]
+            if not candidates:
+                return
+            pub_id, grade = candidates[0], self.random.random() < 0.7
+            resp = await self._call(
+                action, "POST", f"/publications/{pub_id}/vote",
+                json={"grade": grade}, headers=user.headers,
+            )
+            if resp.is_success:
+                user.votes[pub_id] = grade
+        elif action == "vote_update":
+            pub_id = self.random.choice(list(user.votes))
+            grade = not user.votes[pub_id]
+            resp = await self._call(
+                action, "PUT", f"/publications/{pub_id}/vote",
+                json={"grade": grade}, headers=user.headers,
+            )
+            if resp.is_success:
+                user.votes[pub_id] = grade
+        else:
+            pub_id = self.random.choice(list(user.votes))
+            resp = await self._call(
+                action, "DELETE", f"/publications/{pub_id}/vote", headers=user.headers,
+            )
+            if resp.is_success:
+                del user.votes[pub_id]
+
+    async def setup(self, users: int, publications: int) -> list[VirtualUser]:
+        run_id = uuid.uuid4().hex[:8]
+        vusers = [VirtualUser(username=f"load_{run_id}_{i}") for i in range(users)]
+        for user in vusers:
+            resp = await self.client.post(
+                "/users", json={"username": user.username, "password": PASSWORD}
+            )
+            resp.raise_for_status()
+            await self.login(user, name="setup")
+        for i in range(publications):
+            author = vusers[i % len(vusers)]
+            resp = await self.client.post(
+                "/publications", json={"content": f"load test {run_id} #{i}"},
+                headers=author.headers,
+            )
+            resp.raise_for_status()
+            self.publication_ids.append(resp.json()["details"]["id"])
+        self.recorder = Recorder()  # setup traffic is not part of the results
+        return vusers
+
+    async def worker(self, user: VirtualUser, deadline: float) -> None:
+        names, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline:
+            action = self.random.choices(names, weights)[0]
+            if action == "login":
+                await self.login(user)
+            elif action == "refresh":
+                await self.refresh(user)
+            elif action.startswith("list_"):
+                await self.list_publications(action[len("list_"):])
+            else:
+                await self.vote(user, action)
+
+    async def run(self, vusers: list[VirtualUser], duration: float) -> dict:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(user, deadline) for user in vusers))
+        return self.recorder.report(time.perf_counter() - started)
+
+
+@contextmanager
+def booted_app(workers: int):
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BASE_DIR, check=True
+    )
+    with gunicorn(workers, PRELOAD_APP="true", LOG_LEVEL="warning") as (proc, port):
+        # drain the log so a chatty worker never blocks on a full pipe
+        threading.Thread(target=proc.stderr.read, daemon=True).start()
+        url = f"http://127.0.0.1:{port}"
+        for _ in range(300):
+            try:
+                if httpx.get(f"{url}/readiness").is_success:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        else:
+            raise TimeoutError("app did not become ready")
+        yield url
+
+
+async def load(args: argparse.Namespace, url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        test = LoadTest(client, DEFAULT_MIX, args.seed)
+        vusers = await test.setup(args.concurrency, args.publications)
+        results = await test.run(vusers, args.duration)
+    results["config"] = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "publications": args.publications,
+        "workers": args.workers if args.boot else None,
+        "mix": DEFAULT_MIX,
+        "seed": args.seed,
+    }
+    return results
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    if args.boot:
+        with booted_app(args.workers) as url:
+            results = asyncio.run(load(args, url))
+    else:
+        results = asyncio.run(load(args, args.url))
+
+    output = str(BASELINE_FILE) if args.save_baseline else args.output
+    write_results(results, output)
+    return 0
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, base in baseline["endpoints"].items():
+        cur = current["endpoints"].get(name)
+        if cur is None:
+            regressions.append(f"{name}: missing from current results")
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.1f}ms -> {cur['p95_ms']:.1f}ms"
+            )
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']:.1f} -> {cur['rps']:.1f}")
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {cur['errors']}")
+    return regressions
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base url of a running app")
+    target.add_argument("--boot", action="store_true",
+                        help="migrate and start gunicorn")
+    run.add_argument("--workers", type=int, default=2)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--duration", type=float, default=20.0)
+    run.add_argument("--publications", type=int, default=200)
+    run.add_argument("--seed", type=int, default=42)
+    out = run.add_mutually_exclusive_group()
+    out.add_argument("-o", "--output", default=None,
+                     help="JSON file, stdout by default")
+    out.add_argument("--save-baseline", action="store_true",
+                     help=f"write {BASELINE_FILE.name}")
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare")
+    cmp_.add_argument("results")
+    cmp_.add_argument("--baseline", default=str(BASELINE_FILE))
+    cmp_.add_argument("--tolerance", type=float, default=0.15)
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Microbenchmarks of the service, schema and JWT hot paths.
+
+    python -m benchmarks.micro run -o before.json
+    python -m benchmarks.micro run --db -o after.json   # also query Postgres
+    python -m benchmarks.micro compare before.json after.json --tolerance 0.1
+
+Nothing here touches the network. ``--db`` additionally executes
+``service.get_publications`` against the configured (migrated, seeded)
+database, e.g. one filled by ``benchmarks.dataset``.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import statistics
+import sys
+import time
+from typing import Callable
+
+from benchmarks.common import write_results
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a factory returning the zero-argument callable to time."""
+
+    def decorator(factory):
+        BENCHMARKS[name] = factory
+        return factory
+
+    return decorator
+
+
+def _user(id_: int = 1):
+    from src.users.models import User
+
+    return User(id=id_, username=f"user{id_}", password=b"", is_admin=False)
+
+
+@benchmark("service.get_publications_stmt")
+def bench_publications_stmt():
+    from src.publications import service
+
+    return lambda: service.get_publications_stmt("rating", True, 10)
+
+
+@benchmark("service.get_publications_stmt.compile")
+def bench_publications_stmt_compile():
+    from sqlalchemy.dialects import postgresql
+    from src.publications import service
+
+    dialect = postgresql.asyncpg.dialect()
+    return lambda: (
+        service.get_publications_stmt("rating", True, 10).compile(dialect=dialect)
+    )
+
+
+@benchmark("schemas.publication_list.validate[10]")
+def bench_publication_list_10():
+    return _publication_list_adapter(10)
+
+
+@benchmark("schemas.publication_list.validate[100]")
+def bench_publication_list_100():
+    return _publication_list_adapter(100)
+
+
+def _publication_list_adapter(size: int):
+    from src.publications.use_case import GetPublicationList
+
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "id": i, "content": "x" * 280, "truncated": False, "created_at": now,
+            "rating": i % 7 - 3, "vote_count": i % 11,
+            "creator": {"id": i % 5 + 1, "username": f"user{i % 5 + 1}"},
+        }
+        for i in range(size)
+    ]
+    adapter = GetPublicationList._pubs_adapter
+    return lambda: adapter.validate_python(rows, from_attributes=True)
+
+
+@benchmark("jwt.access_token.encode")
+def bench_token_encode():
+    from src.auth.jwt import AccessToken
+
+    user = _user()
+    return lambda: str(AccessToken.for_user(user))
+
+
+@benchmark("jwt.access_token.decode")
+def bench_token_decode():
+    from src.auth.jwt import AccessToken
+
+    token = str(AccessToken.for_user(_user()))
+    return lambda: AccessToken(token)
+
+
+@benchmark("users.check_password")
+def bench_check_password():
+    user = _user()
+    user.set_password("123Aa!")
+    return lambda: user.check_password("123Aa!")
+
+
+@benchmark("schemas.default_response")
+def bench_default_response():
+    from src.common.schemas import DefaultResponse
+
+    return lambda: DefaultResponse(status=True, msg="ok", details={"id": 1})
+
+
+def _db_benchmarks() -> dict[str, Callable[[], Callable[[], object]]]:
+    from src.database.engine import async_session
+    from src.publications import service
+
+    loop = asyncio.new_event_loop()
+
+    def query(order_by: str, limit: int = 10, fields: str | None = None):
+        async def run():
+            async with async_session() as session:
+                return await service.get_publications(
+                    session, order_by, True, limit, fields=fields
+                )
+
+        return lambda: loop.run_until_complete(run())
+
+    return {
+        "db.get_publications[rating]": lambda: query("rating"),
+        "db.get_publications[created_at]": lambda: query("created_at"),
+        "db.get_publications[hot]": lambda: query("hot"),
+        "db.get_publications[best]": lambda: query("best"),
+        # pages where the per-row cost of creators and contents shows
+        "db.get_publications[created_at,100]": lambda: query("created_at", 100),
+        "db.get_publications[hot,100]": lambda: query("hot", 100),
+        "db.get_publications[created_at,100,creator]": (
+            lambda: query("created_at", 100, "id,creator")
+        ),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """Time ``func`` like ``timeit``: auto-sized loops, best of ``repeat``."""
+    func()  # warm up caches (compiled statements, validators)
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+
+    per_op = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            per_op.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    median = statistics.median(per_op)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_us": min(per_op) * 1e6,
+        "median_us": median * 1e6,
+        "stdev_us": statistics.pstdev(per_op) * 1e6,
+        "ops_per_s": 1 / median,
+    }
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    benchmarks = dict(BENCHMARKS)
+    if args.db:
+        benchmarks.update(_db_benchmarks())
+
+    results = {}
+    for name, factory in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(factory(), args.repeat, args.min_time)
+        print(f"{name:45} {results[name]['median_us']:12.2f} us", file=sys.stderr)
+
+    write_results({"benchmarks": results}, args.output)
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.before) as f:
+        before = json.load(f)["benchmarks"]
+    with open(args.after) as f:
+        after = json.load(f)["benchmarks"]
+
+    slower = False
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name]["median_us"], after[name]["median_us"]
+        change = new / old - 1
+        mark = ""
+        if change > args.tolerance:
+            mark, slower = "  SLOWER", True
+        elif change < -args.tolerance:
+            mark = "  faster"
+        print(f"{name:45} {old:12.2f} -> {new:12.2f} us {change:+8.1%}{mark}")
+    return 1 if slower else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run")
+    run.add_argument("--db", action="store_true",
+                     help="include queries against Postgres")
+    run.add_argument("--filter", default=None,
+                     help="only benchmarks containing this text")
+    run.add_argument("--repeat", type=int, default=7)
+    run.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    run.add_argument("-o", "--output", default=None,
+                     help="JSON file, stdout by default")
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare")
+    cmp_.add_argument("before")
+    cmp_.add_argument("after")
+    cmp_.add_argument("--tolerance", type=float, default=0.1)
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Cold-start time and per-worker memory of the gunicorn deployment.
+
+    python -m benchmarks.startup --workers 4 --runs 5 --budget 1.5
+
+Uses the regular app settings (.env) with the startup warm-up turned off, so
+workers measure the app's own cold start: nothing connects to Postgres until a
+request needs it and the database does not have to be reachable.
+"""
+import argparse
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import BASE_DIR, gunicorn, summarize, write_results
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - t)"
+)
+READY_LINE = re.compile(r"Application startup complete")
+SMAPS_FIELDS = (
+    "Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"
+)
+
+
+def measure_import(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def _children(pid: int) -> list[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> dict[str, int]:
+    """Return smaps_rollup counters (kB); Pss is what a worker really costs."""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    usage[key] = int(rest.split()[0])
+    except OSError:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["Rss"] = int(line.split()[1])
+    return usage
+
+
+def measure_gunicorn(workers: int, preload: bool, timeout: float) -> dict:
+    started = time.perf_counter()
+    preload_app = str(preload).lower()
+    with gunicorn(
+        workers, PRELOAD_APP=preload_app, LOG_LEVEL="info", WARMUP_ON_STARTUP="false"
+    ) as (proc, _):
+        ready = threading.Semaphore(0)
+
+        def follow_log():
+            for line in proc.stderr:
+                if READY_LINE.search(line):
+                    ready.release()
+
+        threading.Thread(target=follow_log, daemon=True).start()
+
+        first_ready = None
+        for _ in range(workers):
+            left = timeout - (time.perf_counter() - started)
+            if not ready.acquire(timeout=max(left, 0)):
+                raise TimeoutError(f"gunicorn workers not ready after {timeout}s")
+            first_ready = first_ready or time.perf_counter() - started
+        all_ready = time.perf_counter() - started
+
+        time.sleep(0.5)  # let workers settle after startup allocations
+        worker_memory = [_memory_kb(pid) for pid in _children(proc.pid)]
+        return {
+            "preload": preload,
+            "workers": workers,
+            "first_worker_ready_s": first_ready,
+            "all_workers_ready_s": all_ready,
+            "master_kb": _memory_kb(proc.pid),
+            "worker_kb": worker_memory,
+            "worker_pss_kb": summarize(
+                [m.get("Pss", m.get("Rss", 0)) for m in worker_memory]
+            ),
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold imports of src.main")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="fail if the median import time exceeds this many seconds")
+    parser.add_argument("--skip-gunicorn", action="store_true")
+    parser.add_argument("-o", "--output", default=None,
+                        help="JSON file, stdout by default")
+    args = parser.parse_args()
+
+    import_stats = summarize(measure_import(args.runs))
+    results = {"import_s": import_stats}
+    if not args.skip_gunicorn:
+        results["gunicorn"] = [
+            measure_gunicorn(args.workers, preload, args.timeout)
+            for preload in (False, True)
+        ]
+    write_results(results, args.output)
+
+    if args.budget is not None and import_stats["median"] > args.budget:
+        print(
+            f"import of src.main took {import_stats['median']:.3f}s, "
+            f"budget is {args.budget:.3f}s",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import gc
 import multiprocessing
 import os
 
@@ -28,6 +29,7 @@ graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "120")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
 use_loglevel = os.getenv("LOG_LEVEL", "info")
+preload_app_str = os.getenv("PRELOAD_APP", "false")
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -37,4 +39,21 @@ worker_tmp_dir = "/dev/shm"
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
-# logconfig = os.getenv("LOG_CONFIG", "/src/logging_production.ini")
\ No newline at end of file
+# Import the app once in the master so workers share its pages copy-on-write
+preload_app = preload_app_str.lower() in ("1", "true", "yes")
+# logconfig = os.getenv("LOG_CONFIG", "/src/logging_production.ini")
+
+
+# Gunicorn server hooks
+def when_ready(server):
+    if preload_app:
+        # Keep the collector from touching (and thus copying) objects the
+        # workers inherit from the master.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from src.database.engine import reset_engines
+
+        reset_engines()
@@ -15,3 +15,7 @@ class InvalidToken(NotAuthenticated):
 
 class InvalidCredentials(NotAuthenticated):
     DETAIL = "Invalid credentials."
+
+
+class AdminRequired(PermissionDenied):
+    DETAIL = "Admin rights required."
@@ -11,6 +11,7 @@ from src.auth.schemas import JWTPayload
 from src.users.models import User
 
 bearer_token = HTTPBearer()
+optional_bearer_token = HTTPBearer(auto_error=False)
 
 
 def encode(payload: dict) -> str:
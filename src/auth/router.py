@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends
 
+from src.auth.jwt import AccessToken
 from src.auth.schemas import AuthUser, RefreshToken, TokenResponse
 from src.auth.use_case import CreateTokenPair, UserLogout, RefreshTokenPair
+from src.common.idempotency import IdempotentRoute, idempotent
 from src.common.schemas import DefaultResponse
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 @router.post("/token", response_model=TokenResponse)
+# the replayed pair must not outlive its access token
+@idempotent(
+    ttl_seconds=int(AccessToken.lifetime.total_seconds()), scope_field="username"
+)
 async def token_obtain_pair(
         auth_data: AuthUser, use_case: CreateTokenPair = Depends(),
 ):
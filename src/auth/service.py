@@ -6,11 +6,16 @@ from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.exceptions import InvalidCredentials, AuthorizationFailed, InvalidToken
+from src.auth.exceptions import (
+    AdminRequired,
+    InvalidCredentials,
+    AuthorizationFailed,
+    InvalidToken,
+)
 from src.auth.models import BlacklistedToken
 from src.auth.schemas import AuthUser
 from src.users.models import User
-from src.auth.jwt import Token, AccessToken, bearer_token
+from src.auth.jwt import Token, AccessToken, bearer_token, optional_bearer_token
 from src.database import AsyncDbSession
 from src.users.service import get_user_by_id, get_user_by_username
 
@@ -73,3 +78,32 @@ async def get_current_user(
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
+async def get_admin_user(user: CurrentUser) -> User:
+    if not user.is_admin:
+        raise AdminRequired()
+    return user
+
+
+AdminUser = Annotated[User, Depends(get_admin_user)]
+
+
+async def get_optional_user_id(
+        session: AsyncDbSession,
+        token: HTTPAuthorizationCredentials | None = Depends(optional_bearer_token),
+) -> int | None:
+    """Id of the caller if a bearer token was sent, without loading the user."""
+    if token is None:
+        return None
+    token = AccessToken(token=token.credentials)
+    if await in_blacklist(session, token):
+        raise InvalidToken()
+
+    try:
+        return int(token['sub'])
+    except (KeyError, ValueError):
+        raise InvalidToken()
+
+
+OptionalUserId = Annotated[int | None, Depends(get_optional_user_id)]
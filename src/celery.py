@@ -1,7 +1,12 @@
 from celery import Celery
+from celery.signals import worker_process_init
 
 from src.config import settings
 from src.auth.tasks import task_settings as auth_task_settings
+from src.publications.tasks import task_settings as publications_task_settings
+from src.outbox.tasks import task_settings as outbox_task_settings
+from src.users.tasks import task_settings as users_task_settings
+from src.database.engine import reset_engines
 
 app: Celery = Celery(
     __name__,
@@ -10,9 +15,18 @@ app: Celery = Celery(
 )
 
 app.autodiscover_tasks(
-    ['src.auth']
+    ['src.auth', 'src.publications', 'src.outbox', 'src.users']
 )
 
 app.conf.beat_schedule = {
-    **auth_task_settings
+    **auth_task_settings,
+    **publications_task_settings,
+    **outbox_task_settings,
+    **users_task_settings,
 }
+
+
+@worker_process_init.connect
+def reset_db_pools(**kwargs) -> None:
+    # prefork children must not reuse connections opened by the parent
+    reset_engines()
@@ -31,3 +31,21 @@ class NotAuthenticated(DetailedHTTPException):
 
     def __init__(self) -> None:
         super().__init__(headers={"WWW-Authenticate": "Bearer"})
+
+
+class Conflict(DetailedHTTPException):
+    STATUS_CODE = status.HTTP_409_CONFLICT
+    DETAIL = "Conflict"
+
+
+class InvalidIdempotencyKey(BadRequest):
+    DETAIL = "Invalid Idempotency-Key"
+
+
+class IdempotencyKeyInUse(Conflict):
+    DETAIL = "A request with this Idempotency-Key is still in progress"
+
+
+class IdempotencyKeyReused(DetailedHTTPException):
+    STATUS_CODE = status.HTTP_422_UNPROCESSABLE_ENTITY
+    DETAIL = "Idempotency-Key already used for a different request"
@@ -0,0 +1,274 @@
+"""Idempotency-Key support: a retried POST gets the response of the first attempt.
+
+Endpoints opt in with ``@idempotent`` on routers whose ``route_class`` is
+``IdempotentRoute``. For a request carrying the header, the first response
+below 500 is stored under the method, path, Authorization and key, and is
+replayed, with ``Idempotent-Replayed: true``, to every later request with
+the same key and body before any dependency runs, so a replay never touches
+Postgres. A duplicate arriving while the first is still running waits for
+its response. Errors raised by the endpoint are not stored: a retry runs
+again. When redis is unreachable requests run as if they had no key.
+
+Keys and bodies are only stored as HMACs keyed by JWT_SECRET, so the
+store never holds anything a password could be guessed from.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Coroutine, Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from redis.exceptions import RedisError
+
+from src.auth.config import auth_config
+from src.common.exceptions import (
+    IdempotencyKeyInUse,
+    IdempotencyKeyReused,
+    InvalidIdempotencyKey,
+)
+from src.common.redis import get_redis
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# a reservation in redis outlives any idempotent request, and goes away
+# on its own if the worker running it dies
+RESERVATION_SECONDS = 60.0
+POLL_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class Idempotency:
+    ttl_seconds: int | None = None  # at most IDEMPOTENCY_TTL_SECONDS
+    scope_field: str | None = None
+
+
+def idempotent(
+        endpoint=None, *, ttl_seconds: int | None = None, scope_field: str | None = None
+):
+    """Honour Idempotency-Key on ``endpoint``, see IdempotentRoute.
+
+    ``ttl_seconds`` shortens how long its responses are kept. Anonymous
+    endpoints name the JSON body field telling their callers apart in
+    ``scope_field``, so that callers never share a key.
+    """
+    def decorator(endpoint):
+        endpoint.idempotency = Idempotency(ttl_seconds, scope_field)
+        return endpoint
+
+    return decorator if endpoint is None else decorator(endpoint)
+
+
+def _mac(data: bytes) -> str:
+    return hmac.new(auth_config.JWT_SECRET.encode(), data, hashlib.sha256).hexdigest()
+
+
+def _scope(body: bytes, field_name: str | None):
+    if field_name is None:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None  # the endpoint rejects it anyway
+    return data.get(field_name) if isinstance(data, dict) else None
+
+
+def stored_response(response: Response) -> dict:
+    return {
+        "status_code": response.status_code,
+        "headers": [
+            [name.decode("latin-1"), value.decode("latin-1")]
+            for name, value in response.raw_headers
+            if name != b"content-length"
+        ],
+        "body": base64.b64encode(response.body).decode(),
+    }
+
+
+def replayed_response(stored: dict) -> Response:
+    response = Response(
+        content=base64.b64decode(stored["body"]), status_code=stored["status_code"]
+    )
+    response.raw_headers = [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in stored["headers"]
+    ] + [(b"content-length", str(len(response.body)).encode())]
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    response: dict | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MemoryStore:
+    """Responses kept by this worker, duplicates sent to other workers still run."""
+
+    def __init__(self):
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    async def begin(self, key: str, fingerprint: str, ttl: int) -> dict | None:
+        """The stored response of ``key``, or None after reserving it for the caller."""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                entry.done.set()
+                entry = None
+            if entry is None:
+                self._entries[key] = _Entry(fingerprint, time.monotonic() + ttl)
+                while len(self._entries) > settings.IDEMPOTENCY_CACHE_SIZE:
+                    self._entries.popitem(last=False)[1].done.set()
+                return None
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReused()
+            if entry.response is not None:
+                return entry.response
+            try:
+                await asyncio.wait_for(entry.done.wait(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise IdempotencyKeyInUse() from None
+
+    async def complete(
+            self, key: str, fingerprint: str, response: dict, ttl: int
+    ) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.fingerprint == fingerprint:
+            entry.response = response
+            entry.done.set()
+
+    async def abort(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.done.set()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        # the oldest mostly expire first, begin() checks the others
+        while self._entries and next(iter(self._entries.values())).expires_at <= now:
+            self._entries.popitem(last=False)[1].done.set()
+
+
+class RedisStore:
+    """Responses shared by all workers, as JSON under ``idempotency:<key>``."""
+
+    async def begin(self, key: str, fingerprint: str, ttl: int) -> dict | None:
+        redis = get_redis()
+        name = f"idempotency:{key}"
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            reserved = await redis.set(
+                name, json.dumps({"fingerprint": fingerprint}),
+                nx=True, px=int(RESERVATION_SECONDS * 1000),
+            )
+            if reserved:
+                return None
+            entry = await redis.get(name)
+            if entry is not None:
+                entry = json.loads(entry)
+                if entry["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyReused()
+                if "response" in entry:
+                    return entry["response"]
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInUse()
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def complete(
+            self, key: str, fingerprint: str, response: dict, ttl: int
+    ) -> None:
+        await get_redis().set(
+            f"idempotency:{key}",
+            json.dumps({"fingerprint": fingerprint, "response": response}),
+            ex=ttl,
+        )
+
+    async def abort(self, key: str) -> None:
+        await get_redis().delete(f"idempotency:{key}")
+
+
+memory_store = MemoryStore()
+redis_store = RedisStore()
+
+
+def get_store() -> MemoryStore | RedisStore:
+    return memory_store if settings.IDEMPOTENCY_STORE == "memory" else redis_store
+
+
+class IdempotentRoute(APIRoute):
+    """Route answering the ``@idempotent`` endpoints' retries from the store."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        options = getattr(self.endpoint, "idempotency", None)
+        if options is None:
+            return handler
+
+        async def idempotent_handler(request: Request) -> Response:
+            idempotency_key = request.headers.get("Idempotency-Key")
+            if idempotency_key is None:
+                return await handler(request)
+            if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+                raise InvalidIdempotencyKey()
+
+            body = await request.body()
+            key = _mac(repr((
+                request.method,
+                request.url.path,
+                request.headers.get("Authorization"),
+                _scope(body, options.scope_field),
+                idempotency_key,
+            )).encode())
+            fingerprint = _mac(body)
+            ttl = min(
+                options.ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS,
+                settings.IDEMPOTENCY_TTL_SECONDS,
+            )
+            store = get_store()
+            try:
+                stored = await store.begin(key, fingerprint, ttl)
+            except (RedisError, OSError):
+                logger.warning("idempotency store unavailable, running the request")
+                return await handler(request)
+            if stored is not None:
+                return replayed_response(stored)
+
+            try:
+                response = await handler(request)
+            except BaseException:
+                await _forget(store, key)
+                raise
+            if response.status_code >= 500:
+                await _forget(store, key)
+                return response
+            try:
+                await store.complete(key, fingerprint, stored_response(response), ttl)
+            except (RedisError, OSError):
+                logger.warning("response of idempotency key %s not stored", key)
+            return response
+
+        return idempotent_handler
+
+
+async def _forget(store: MemoryStore | RedisStore, key: str) -> None:
+    try:
+        await store.abort(key)
+    except (RedisError, OSError):
+        logger.warning("reservation of idempotency key %s not released", key)
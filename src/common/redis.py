@@ -0,0 +1,13 @@
+from redis import asyncio as aioredis
+
+from src.config import settings
+
+_redis: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    """The worker's client, created on first use so forked workers get their own."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(str(settings.REDIS_URL), socket_connect_timeout=1)
+    return _redis
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
 from typing import Optional, Any
 
 
@@ -6,6 +7,24 @@ class BaseSchema(BaseModel):
     pass
 
 
+class QueryParams(BaseSchema):
+    """Query string parameters, used as ``params: Model = Depends()``.
+
+    FastAPI does not check field constraints of such models, they fail
+    when it builds the instance. Report that as a 422 like any other
+    invalid parameter instead of a server error.
+    """
+
+    def __init__(self, **data: Any) -> None:
+        try:
+            super().__init__(**data)
+        except ValidationError as exc:
+            errors = [
+                {**error, "loc": ("query", *error["loc"])} for error in exc.errors()
+            ]
+            raise RequestValidationError(errors) from None
+
+
 class DefaultResponse(BaseSchema):
     status: bool
     msg: str
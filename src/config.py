@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 from pydantic import RedisDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -30,6 +30,83 @@ class Config(BaseSettings):
 
     APP_VERSION: str = "1"
 
+    # Serve publication listings from the publication_scores snapshot,
+    # refreshed by celery beat every PUBLICATION_SNAPSHOT_REFRESH_SECONDS.
+    PUBLICATION_SNAPSHOT: bool = False
+    PUBLICATION_SNAPSHOT_REFRESH_SECONDS: float = 5.0
+
+    # Spread the vote totals of each publication over this many rows, 0 to
+    # update the publication row itself. Sharded totals are folded back by
+    # celery beat every VOTE_SHARDS_COMPACT_SECONDS, and until then the hot
+    # and best orders and the listing validators lag behind the votes.
+    VOTE_COUNTER_SHARDS: int = 0
+    VOTE_SHARDS_COMPACT_SECONDS: float = 2.0
+
+    # How long each worker reuses a computed order_by=trending page, and how
+    # many pages it keeps.
+    TRENDING_CACHE_SECONDS: float = 30.0
+    TRENDING_CACHE_SIZE: int = 1_000
+
+    # Outbox consumer: polled by celery beat, each run handles at most
+    # OUTBOX_MAX_BATCHES batches of OUTBOX_BATCH_SIZE events.
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_MAX_BATCHES: int = 20
+
+    # usernames of listed creators each worker keeps in memory
+    CREATOR_CACHE_SIZE: int = 10_000
+
+    # GET /users/{id}/stats: user_stats is refreshed by celery beat every
+    # USER_STATS_REFRESH_SECONDS, workers reuse a read for
+    # USER_STATS_CACHE_SECONDS and keep at most USER_STATS_CACHE_SIZE.
+    USER_STATS_REFRESH_SECONDS: float = 5.0
+    USER_STATS_CACHE_SECONDS: float = 30.0
+    USER_STATS_CACHE_SIZE: int = 10_000
+
+    # pause between the vote batches the purge of a deleted publication removes
+    PUBLICATION_PURGE_PAUSE_SECONDS: float = 0.1
+
+    # GET /publications/live: at most one update per publication every
+    # LIVE_UPDATE_INTERVAL seconds for up to LIVE_MAX_IDS publications, and
+    # a comment every LIVE_KEEPALIVE_SECONDS to keep idle streams open
+    LIVE_UPDATE_INTERVAL: float = 1.0
+    LIVE_MAX_IDS: int = 100
+    LIVE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Idempotency-Key of POST requests: responses are kept for
+    # IDEMPOTENCY_TTL_SECONDS (POST /auth/token only as long as its access
+    # token lives) in redis, shared by the workers, or in each
+    # worker's memory (at most IDEMPOTENCY_CACHE_SIZE of them). A duplicate
+    # of a request still running waits up to IDEMPOTENCY_WAIT_SECONDS.
+    IDEMPOTENCY_STORE: Literal["redis", "memory"] = "redis"
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000
+
+    # characters of content listings return unless asked for the full body
+    PUBLICATION_EXCERPT_LENGTH: int = 280
+
+    # Cache-Control of anonymous GET /publications responses (seconds).
+    # Their validators come from change_versions rows that every write
+    # bumps, one of several picked at random. Without VOTE_COUNTER_SHARDS
+    # votes still queue on the row of the publication they are for:
+    # benchmarks/contention.py with 32 voters on a few viral publications
+    # gives 117 votes/s and 26 backends waiting on locks, 267 votes/s and
+    # 2 waiting with 8 shards.
+    LIST_CACHE_MAX_AGE: int = 5
+    LIST_CACHE_STALE_WHILE_REVALIDATE: int = 30
+
+    # Listings (as query strings) every worker runs once per pooled
+    # connection before it starts accepting requests.
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_LISTINGS: list[str] = [
+        "order_by=rating&desc=false&limit=10",
+        "order_by=rating&desc=true&limit=10",
+        "order_by=created_at&desc=true&limit=10",
+    ]
+    WARMUP_TIMEOUT_SECONDS: float = 10.0
+    WARMUP_RETRY_SECONDS: float = 5.0
+
     model_config = SettingsConfigDict(env_file=".env", extra='ignore')
 
     def get_db_url(self, *, async_: bool = True) -> str:
@@ -1,15 +1,18 @@
 from typing import Type
 from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 
 
 class Base(DeclarativeBase):
     ...
 
 
-async def remove_by_id(session: AsyncSession, model: Type[Base], id_: int) -> Base:
-    obj = await session.scalar(
+def remove_by_id(session: AsyncSession | Session, model: Type[Base], id_: int):
+    """Delete the row of ``model`` with ``id_`` and return it, None if there is none.
+
+    Works with both kinds of session: await the result with an AsyncSession.
+    """
+    return session.scalar(
         delete(model).where(model.id == id_).returning(model)
     )
-    return obj
@@ -1,12 +1,17 @@
+from typing import Any
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.config import settings
 
-async_engine = create_async_engine(settings.get_db_url(), echo=False)
 
-sync_engine = create_engine(settings.get_db_url(async_=False), echo=False)
+def _create_async_engine():
+    return create_async_engine(settings.get_db_url(), echo=False)
+
+
+async_engine = _create_async_engine()
 
 async_session = async_sessionmaker(
     bind=async_engine,
@@ -14,8 +19,37 @@ async_session = async_sessionmaker(
     autoflush=False,
 )
 
-sync_session = sessionmaker(
-    bind=sync_engine,
-    expire_on_commit=False,
-    autoflush=False,
-)
+
+def _create_sync_engine():
+    # The sync engine is only used by celery tasks, so psycopg is not
+    # imported by web workers until something actually asks for it.
+    engine = create_engine(settings.get_db_url(async_=False), echo=False)
+    session = sessionmaker(
+        bind=engine,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+    return engine, session
+
+
+def __getattr__(name: str) -> Any:
+    if name in ("sync_engine", "sync_session"):
+        engine, session = _create_sync_engine()
+        globals().update(sync_engine=engine, sync_session=session)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def reset_engines() -> None:
+    """Give a freshly forked process database engines of its own.
+
+    The async engine is rebuilt rather than disposed with ``close=False``:
+    recreating an asyncio pool in place leaves its first-connect hook
+    guarded by a thread lock, which deadlocks concurrent coroutines.
+    """
+    global async_engine
+
+    async_engine = _create_async_engine()
+    async_session.configure(bind=async_engine)
+    if "sync_engine" in globals():
+        globals()["sync_engine"].dispose(close=False)
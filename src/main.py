@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -9,8 +12,24 @@ from src.users.router import router as users_router
 from src.publications.router import router as publications_router
 from src.config import app_configs, settings, STATIC_DIR
 from src.common.exceptions import DetailedHTTPException
+from src.publications import warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn only starts accepting connections once this has returned
+    retry = None
+    if settings.WARMUP_ON_STARTUP and not settings.ENVIRONMENT.is_testing:
+        if not await warmup.warm_up():
+            retry = asyncio.create_task(warmup.keep_warming_up())
+    else:
+        warmup.state.ready = True
+    yield
+    if retry is not None:
+        retry.cancel()
 
-app = FastAPI(**app_configs)
+
+app = FastAPI(**app_configs, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +46,16 @@ async def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/readiness", include_in_schema=False)
+async def readiness() -> JSONResponse:
+    if not warmup.state.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming up", "error": warmup.state.error},
+        )
+    return JSONResponse(content={"status": "ready", **warmup.state.details})
+
+
 @app.exception_handler(DetailedHTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
@@ -0,0 +1,9 @@
+from datetime import timedelta
+
+# An event whose handlers failed this many times is given up on, so it
+# stops holding back the later events of its aggregate.
+MAX_ATTEMPTS = 5
+
+# processed events are kept this long for inspection, then deleted
+PROCESSED_RETENTION = timedelta(days=1)
+COMPACT_CHUNK_SIZE = 10_000
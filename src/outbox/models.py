@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import BigInteger, Integer, String, func, text, Index
+
+from src.database import Base
+
+
+class OutboxEvent(Base):
+    """A change committed together with the rows it describes.
+
+    Events of the same aggregate are handled in id order.
+    """
+    __tablename__ = 'outbox_events'
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String, nullable=False)
+    aggregate_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+    processed_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_pending", "id",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+        Index(
+            "ix_outbox_events_pending_aggregate", "aggregate_id", "id",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+        Index(
+            "ix_outbox_events_processed_at", "processed_at",
+            postgresql_where=text("processed_at IS NOT NULL"),
+        ),
+    )
@@ -0,0 +1,149 @@
+import logging
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.outbox.constants import COMPACT_CHUNK_SIZE, MAX_ATTEMPTS, PROCESSED_RETENTION
+from src.outbox.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Session, OutboxEvent], None]
+
+# event type -> handlers, filled by register_handler
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+
+
+def register_handler(*event_types: str) -> Callable[[Handler], Handler]:
+    """Run the decorated function for every processed event of these types.
+
+    Handlers get the consumer's session and run inside its transaction, so
+    whatever they write is committed together with the event being marked
+    as processed.
+    """
+
+    def decorator(handler: Handler) -> Handler:
+        for event_type in event_types:
+            _handlers[event_type].append(handler)
+        return handler
+
+    return decorator
+
+
+async def add_event(
+        session: AsyncSession, event_type: str, aggregate_id: int, **payload
+) -> None:
+    """Queue an event in the caller's transaction.
+
+    Event ids only follow commit order between transactions that lock a
+    common row before adding their events. Writes to an aggregate's row do
+    that, sharded votes do not: they lock their vote row and a shard, so
+    vote events of one publication can be numbered out of commit order.
+    Handlers must not depend on the order of those.
+    """
+    session.add(
+        OutboxEvent(event_type=event_type, aggregate_id=aggregate_id, payload=payload)
+    )
+
+
+async def add_events(
+        session: AsyncSession, event_type: str, events: list[tuple[int, dict]]
+) -> None:
+    """Queue ``(aggregate_id, payload)`` events of one type in a single statement.
+
+    For writes touching many aggregates at once, see ``add_event``.
+    """
+    if events:
+        await session.execute(insert(OutboxEvent), [
+            {"event_type": event_type, "aggregate_id": aggregate_id, "payload": payload}
+            for aggregate_id, payload in events
+        ])
+
+
+def process_events(session: Session, batch_size: int) -> dict:
+    """Hand a batch of pending events to their handlers and commit.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED``, so any number of
+    consumers can run at once. An event is only handled when no earlier
+    event of its aggregate is still pending, otherwise it is left for a
+    later batch.
+    """
+    batch = session.scalars(
+        select(OutboxEvent)
+        .where(OutboxEvent.processed_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    result = {"claimed": len(batch), "processed": 0, "failed": 0, "deferred": 0}
+    if not batch:
+        session.commit()
+        return result
+
+    by_aggregate: dict[int, list[OutboxEvent]] = defaultdict(list)
+    for event in batch:
+        by_aggregate[event.aggregate_id].append(event)
+    # the first pending event of each aggregate that another consumer holds
+    blockers = dict(session.execute(
+        select(OutboxEvent.aggregate_id, func.min(OutboxEvent.id))
+        .where(
+            OutboxEvent.processed_at.is_(None),
+            OutboxEvent.aggregate_id.in_(by_aggregate),
+            OutboxEvent.id.not_in([event.id for event in batch]),
+        )
+        .group_by(OutboxEvent.aggregate_id)
+    ).all())
+
+    for aggregate_id, events in by_aggregate.items():
+        blocker = blockers.get(aggregate_id)
+        for position, event in enumerate(events):
+            if blocker is not None and event.id > blocker:
+                result["deferred"] += len(events) - position
+                break
+            try:
+                with session.begin_nested():
+                    for handler in _handlers.get(event.event_type, ()):
+                        handler(session, event)
+            except Exception as exc:
+                logger.exception(
+                    "outbox event %s (%s) failed", event.id, event.event_type
+                )
+                event.attempts += 1
+                event.last_error = repr(exc)
+                result["failed"] += 1
+                if event.attempts < MAX_ATTEMPTS:
+                    result["deferred"] += len(events) - position - 1
+                    break
+                logger.error(
+                    "outbox event %s given up after %s attempts",
+                    event.id,
+                    event.attempts,
+                )
+            else:
+                result["processed"] += 1
+            event.processed_at = func.localtimestamp()
+    session.commit()
+    return result
+
+
+def compact_events(session: Session) -> int:
+    """Delete events processed longer than PROCESSED_RETENTION ago, in chunks."""
+    deleted = 0
+    while True:
+        chunk = (
+            select(OutboxEvent.id)
+            .where(
+                OutboxEvent.processed_at < func.localtimestamp() - PROCESSED_RETENTION
+            )
+            .limit(COMPACT_CHUNK_SIZE)
+        )
+        count = session.execute(
+            delete(OutboxEvent).where(OutboxEvent.id.in_(chunk.scalar_subquery()))
+        ).rowcount
+        session.commit()
+        deleted += count
+        if count < COMPACT_CHUNK_SIZE:
+            return deleted
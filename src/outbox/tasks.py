@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from celery import shared_task
+
+from src.config import settings
+from src.database.engine import sync_session
+from src.outbox.service import compact_events, process_events
+
+
+@shared_task
+def process_outbox() -> dict:
+    """Drain pending events, at most OUTBOX_MAX_BATCHES batches per run."""
+    totals = {"claimed": 0, "processed": 0, "failed": 0, "deferred": 0}
+    with sync_session() as session:
+        for _ in range(settings.OUTBOX_MAX_BATCHES):
+            result = process_events(session, settings.OUTBOX_BATCH_SIZE)
+            for key, value in result.items():
+                totals[key] += value
+            if result["claimed"] < settings.OUTBOX_BATCH_SIZE:
+                break
+    return totals
+
+
+@shared_task
+def compact_outbox() -> int:
+    with sync_session() as session:
+        return compact_events(session)
+
+
+task_settings = {
+    'process-outbox': {
+        'task': 'src.outbox.tasks.process_outbox',
+        'schedule': timedelta(seconds=settings.OUTBOX_POLL_SECONDS),
+    },
+    'compact-outbox-every-hour': {
+        'task': 'src.outbox.tasks.compact_outbox',
+        'schedule': timedelta(hours=1),
+    },
+}
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from enum import Enum
+
+# "Hot" ordering: log10 of the net rating plus a recency bonus that grows by
+# one every HOT_GRAVITY seconds, so a post needs ten times the rating to
+# outrank one published HOT_GRAVITY seconds later.
+HOT_EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+HOT_GRAVITY = 45000
+
+# "Best" ordering: lower bound of the Wilson score interval of the upvote
+# share at this z (95% confidence), so a few votes rank below many.
+WILSON_Z = 1.96
+
+# text search configuration of Publication.search_vector and of queries
+# against it, changing it needs a migration rebuilding the column
+SEARCH_CONFIG = "english"
+
+# what a listing can be limited to with ``fields=``, my_vote needs a caller
+PUBLICATION_FIELDS = frozenset(
+    ("id", "content", "created_at", "rating", "vote_count", "creator", "my_vote")
+)
+# fields computed from the votes table
+VOTE_FIELDS = frozenset(("rating", "vote_count"))
+
+# rows fetched per round trip by exports, and per chunk written out
+EXPORT_CHUNK_SIZE = 1000
+
+# votes of a deleted publication removed per transaction by the purge task
+PURGE_BATCH_SIZE = 1000
+
+
+# redis pub/sub channel of publications whose votes changed, see src.publications.live
+LIVE_CHANNEL = "publications:counts"
+
+# outbox event types, payloads carry the ids plus the grade involved
+PUBLICATION_CREATED = "publication.created"
+PUBLICATION_DELETED = "publication.deleted"
+VOTE_CREATED = "vote.created"
+VOTE_UPDATED = "vote.updated"
+VOTE_REMOVED = "vote.removed"
+
+
+class TrendingWindow(str, Enum):
+    hour = "1h"
+    day = "24h"
+    week = "7d"
+
+    @property
+    def duration(self) -> timedelta:
+        return {
+            self.hour: timedelta(hours=1),
+            self.day: timedelta(days=1),
+            self.week: timedelta(days=7),
+        }[self]
+
+
+# Vote activity is rolled up per publication and hour. Hourly buckets older
+# than VOTE_BUCKETS_HOURLY_FOR are merged into daily ones, which keeps the
+# 1h and 24h windows exact to the hour and the 7d window to the day, and
+# buckets older than VOTE_BUCKETS_KEPT_FOR are dropped.
+VOTE_BUCKETS_HOURLY_FOR = timedelta(days=2)
+VOTE_BUCKETS_KEPT_FOR = TrendingWindow.week.duration + timedelta(days=1)
@@ -1,4 +1,4 @@
-from src.common.exceptions import BadRequest
+from src.common.exceptions import BadRequest, NotFound, PermissionDenied
 
 
 class AlreadyVoted(BadRequest):
@@ -11,3 +11,19 @@ class PublicationDoesNotExist(BadRequest):
 
 class VoteDoesNotExist(BadRequest):
     DETAIL = "Vote does not exist"
+
+
+class UnknownPublicationField(BadRequest):
+    DETAIL = "Unknown publication field"
+
+
+class InvalidWatchList(BadRequest):
+    DETAIL = "Invalid number of publications to watch"
+
+
+class PublicationNotFound(NotFound):
+    DETAIL = "Publication not found"
+
+
+class NotPublicationCreator(PermissionDenied):
+    DETAIL = "Only the creator or an admin can delete a publication"
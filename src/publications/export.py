@@ -0,0 +1,137 @@
+"""NDJSON export of every publication, one object per line in id order.
+
+    python -m src.publications.export -o publications.ndjson.gz
+    python -m src.publications.export -o publications.ndjson.gz --resume
+    python -m src.publications.export --after-id 125000 > rest.ndjson
+
+Rows are read through a server-side cursor and written chunk by chunk, so
+memory use does not depend on the size of the table. Outputs ending in
+``.gz`` are gzip-compressed. ``--resume`` appends to an interrupted export,
+starting after the last id it contains. The API serves the same lines at
+``GET /publications/export``.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import zlib
+from contextlib import nullcontext
+from typing import AsyncIterator, Iterable
+
+from pydantic import TypeAdapter
+
+from src.publications import service
+from src.publications.schemas import PublicationSummary
+
+_row_adapter = TypeAdapter(PublicationSummary)
+
+
+def ndjson_chunk(rows: Iterable) -> bytes:
+    return b"".join(
+        _row_adapter.dump_json(_row_adapter.validate_python(row, from_attributes=True))
+        + b"\n"
+        for row in rows
+    )
+
+
+async def ndjson_stream(partitions: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for rows in partitions:
+        yield ndjson_chunk(rows)
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            _, _, quality = params.partition("q=")
+            try:
+                return float(quality or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress ``chunks`` as one gzip member, flushed after every chunk."""
+    # the fastest level: this runs on the event loop of a web worker, and
+    # compresses 4x faster than the default for a 30% larger output
+    compressor = zlib.compressobj(1, wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class ExportError(Exception):
+    pass
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def last_exported_id(path: str) -> int:
+    """Id of the last complete line of an earlier export, 0 if there is none.
+
+    A partially written last line of a plain file is cut off so that
+    appending continues on a line of its own.
+    """
+    if not os.path.exists(path):
+        return 0
+    last_id, end = 0, 0
+    with _open(path, "rb") as f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                last_id = json.loads(line)["id"]
+                end += len(line)
+        except EOFError:
+            raise ExportError(
+                f"{path} ends with an unfinished gzip stream, "
+                f"export into a new file with --after-id {last_id}"
+            ) from None
+    if not path.endswith(".gz") and os.path.getsize(path) > end:
+        os.truncate(path, end)
+    return last_id
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=None,
+                        help="file to write, stdout by default; .gz is compressed")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--after-id", type=int, default=0,
+                       help="only export publications with a greater id")
+    start.add_argument("--resume", action="store_true",
+                       help="append to --output after the last id it contains")
+    args = parser.parse_args()
+
+    after_id = args.after_id
+    if args.resume:
+        if args.output is None:
+            parser.error("--resume needs --output")
+        try:
+            after_id = last_exported_id(args.output)
+        except ExportError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+
+    from src.database.engine import sync_session
+
+    exported = 0
+    mode = "ab" if args.resume else "wb"
+    out = _open(args.output, mode) if args.output else nullcontext(sys.stdout.buffer)
+    with sync_session() as session, out as f:
+        for rows in service.iter_publications(session, after_id):
+            f.write(ndjson_chunk(rows))
+            f.flush()
+            exported += len(rows)
+            after_id = rows[-1].id
+
+    print(f"exported {exported} publications, last id {after_id}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
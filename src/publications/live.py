@@ -0,0 +1,153 @@
+"""Live rating and vote_count updates streamed as server-sent events.
+
+Vote use cases publish the id of a publication on LIVE_CHANNEL once
+their transaction has committed. Every web worker keeps a single
+subscription to the channel while it has clients, collects the watched
+ids it hears about, and every LIVE_UPDATE_INTERVAL seconds reads their
+counts with one query and hands them to the streams watching them.
+Messages carry no counts, so however they are ordered or coalesced, the
+last read after a vote sees it.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import AsyncIterator
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.common.redis import get_redis
+from src.config import settings
+from src.database import engine
+from src.publications import service
+from src.publications.constants import LIVE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# wait before subscribing again after the connection to redis failed
+RECONNECT_SECONDS = 1.0
+
+
+async def publish_change(publication_id: int) -> None:
+    """Announce new counts. Lost when redis is down, streams catch up later."""
+    try:
+        await get_redis().publish(LIVE_CHANNEL, str(publication_id))
+    except (RedisError, OSError):
+        logger.warning("live counts of publication %s not published", publication_id)
+
+
+class Subscriber:
+    """One stream: the publications it watches and the updates it has yet to send."""
+
+    def __init__(self, ids: frozenset[int]):
+        self.ids = ids
+        self.updates: dict[int, dict] = {}
+        self.ready = asyncio.Event()
+
+
+class LiveHub:
+    """The worker's subscription to LIVE_CHANNEL and the streams it feeds."""
+
+    def __init__(self, session_factory: async_sessionmaker | None = None):
+        self.subscribers: dict[int, set[Subscriber]] = defaultdict(set)
+        self.pending: set[int] = set()  # changed since the last flush
+        self.session_factory = session_factory
+        self._task: asyncio.Task | None = None
+
+    def add(self, subscriber: Subscriber) -> None:
+        for id_ in subscriber.ids:
+            self.subscribers[id_].add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def remove(self, subscriber: Subscriber) -> None:
+        for id_ in subscriber.ids:
+            watchers = self.subscribers[id_]
+            watchers.discard(subscriber)
+            if not watchers:
+                del self.subscribers[id_]
+
+    def receive(self, data: bytes | str) -> None:
+        try:
+            publication_id = int(data)
+        except (TypeError, ValueError):
+            logger.warning("ignoring live counts message %r", data)
+            return
+        if publication_id in self.subscribers:
+            self.pending.add(publication_id)
+
+    async def flush(self) -> None:
+        """Read the counts changed since the last flush, hand them to their streams."""
+        pending, self.pending = self.pending, set()
+        ids = [id_ for id_ in pending if id_ in self.subscribers]
+        if not ids:
+            return
+        session_factory = self.session_factory or engine.async_session
+        try:
+            async with session_factory() as session:
+                counts = await service.get_publication_counts(session, ids)
+        except (SQLAlchemyError, OSError):
+            logger.warning("live counts not read, retrying", exc_info=True)
+            self.pending.update(ids)
+            return
+        for row in counts:
+            for subscriber in self.subscribers.get(row.id, ()):
+                subscriber.updates[row.id] = row._asdict()
+                subscriber.ready.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.subscribers:
+            try:
+                async with get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(LIVE_CHANNEL)
+                    next_flush = loop.time() + settings.LIVE_UPDATE_INTERVAL
+                    while self.subscribers:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=max(next_flush - loop.time(), 0),
+                        )
+                        if message is not None:
+                            self.receive(message["data"])
+                        if loop.time() >= next_flush:
+                            await self.flush()
+                            next_flush = loop.time() + settings.LIVE_UPDATE_INTERVAL
+            except (RedisError, OSError):
+                logger.warning("live counts subscription lost, retrying", exc_info=True)
+                await asyncio.sleep(RECONNECT_SECONDS)
+            except Exception:
+                # whatever it was, the streams of this worker depend on the loop
+                logger.exception("live counts subscription failed, retrying")
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+
+hub = LiveHub()
+
+
+def sse_event(counts: list[dict]) -> str:
+    return f"data: {json.dumps(counts)}\n\n"
+
+
+async def stream_counts(
+        subscriber: Subscriber, initial: list[dict], hub: LiveHub = hub
+) -> AsyncIterator[str]:
+    """SSE stream of ``initial`` followed by the updates of the watched publications."""
+    hub.add(subscriber)
+    try:
+        if initial:
+            yield sse_event(initial)
+        while True:
+            try:
+                await asyncio.wait_for(
+                    subscriber.ready.wait(), settings.LIVE_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            subscriber.ready.clear()
+            updates, subscriber.updates = subscriber.updates, {}
+            yield sse_event(list(updates.values()))
+    finally:
+        hub.remove(subscriber)
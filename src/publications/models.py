@@ -1,16 +1,31 @@
 from datetime import datetime
 
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import Integer, String, func, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Float,
+    Integer,
+    SmallInteger,
+    String,
+    func,
+    text,
+    ForeignKey,
+    UniqueConstraint,
+    Index,
+)
 
 from src.database import Base
+from src.publications.constants import HOT_EPOCH, HOT_GRAVITY
 
 
 class Publication(Base):
     __tablename__ = 'publications'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    content: Mapped[str] = mapped_column(String, nullable=False)
+    # can be tens of kilobytes, only loaded when accessed
+    content: Mapped[str] = mapped_column(String, nullable=False, deferred=True)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         server_default=func.now(), onupdate=datetime.now, nullable=False
@@ -18,6 +33,73 @@ class Publication(Base):
 
     creator_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
 
+    # vote totals and scores derived from them, kept up to date by the vote use cases
+    upvotes: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    downvotes: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    hot_score: Mapped[float] = mapped_column(
+        Float,
+        # hot_score() of a new row: created_at is now() in the session's time
+        # zone, so the epoch is taken from the same local timestamp
+        server_default=text(
+            f"(extract(epoch from localtimestamp) - {HOT_EPOCH}) / {HOT_GRAVITY}"
+        ),
+        nullable=False,
+    )
+    best_score: Mapped[float] = mapped_column(Float, server_default="0", nullable=False)
+
+    # set when the publication is deleted: it is hidden from then on, and
+    # the row goes once the purge task has removed its votes
+    deleted_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    # to_tsvector(SEARCH_CONFIG, content), filled by the publications_search_vector
+    # trigger (see the migration) and only read inside queries
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, deferred=True)
+
+    __table_args__ = (
+        Index("ix_publications_hot_score", "hot_score"),
+        Index("ix_publications_best_score", "best_score"),
+        Index("ix_publications_search_vector", "search_vector", postgresql_using="gin"),
+        # listing filters: a creator's publications, a creation-time range
+        Index("ix_publications_creator_id_created_at", "creator_id", "created_at"),
+        Index("ix_publications_created_at", "created_at"),
+        # the few publications waiting to be purged
+        Index(
+            "ix_publications_deleted_at", "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
+
+
+class PublicationVoteBucket(Base):
+    """Net votes a publication received during one hour (or day, once compacted)."""
+    __tablename__ = 'publication_vote_buckets'
+
+    publication_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("publications.id"), primary_key=True
+    )
+    bucket_start: Mapped[datetime] = mapped_column(primary_key=True)
+    votes: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_publication_vote_buckets_bucket_start", "bucket_start"),
+    )
+
+
+class PublicationVoteShard(Base):
+    """Vote totals of a publication not yet folded into its row.
+
+    With VOTE_COUNTER_SHARDS set, every vote adds to one of that many rows
+    picked at random, so concurrent voters rarely wait for each other.
+    """
+    __tablename__ = 'publication_vote_shards'
+
+    publication_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("publications.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    upvotes: Mapped[int] = mapped_column(Integer, nullable=False)
+    downvotes: Mapped[int] = mapped_column(Integer, nullable=False)
+
 
 class Vote(Base):
     __tablename__ = 'votes'
@@ -29,4 +111,54 @@ class Vote(Base):
 
     __table_args__ = (
         UniqueConstraint("publication_id", "user_id"),
+        # the unique constraint cannot serve lookups by user
+        Index("ix_votes_user_id_id", "user_id", "id"),
+    )
+
+
+class PublicationScore(Base):
+    """Periodically refreshed snapshot of publication ratings."""
+    __tablename__ = 'publication_scores'
+
+    publication_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("publications.id", ondelete="CASCADE"), primary_key=True
+    )
+    creator_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    creator_username: Mapped[str] = mapped_column(String, nullable=False)
+    rating: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    vote_count: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_publication_scores_rating", "rating", "publication_id"),
+    )
+
+
+class StalePublicationScore(Base):
+    """Publications whose snapshot row must be recomputed on the next refresh."""
+    __tablename__ = 'stale_publication_scores'
+
+    publication_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+
+class ChangeVersion(Base):
+    """A counter bumped by every write that changes what a listing returns.
+
+    Each counter is spread over a few slots, a writer bumps one of them, and
+    its value is the sum of them all.
+    """
+    __tablename__ = 'change_versions'
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    slot: Mapped[int] = mapped_column(
+        SmallInteger, primary_key=True, server_default="0"
+    )
+    version: Mapped[int] = mapped_column(BigInteger, server_default="0", nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Header, Path, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi import status
 
-from src.auth.service import CurrentUser
+from src.auth.service import CurrentUser, OptionalUserId
+from src.common.idempotency import IdempotentRoute, idempotent
 from src.publications.schemas import PublicationCreate, VoteBase, ItemQueryParams
 from src.publications.use_case import (
     CreatePublication,
+    DeletePublication,
+    ExportPublications,
+    GetPublication,
     GetPublicationList,
+    StreamPublicationCounts,
     VotedForPublication,
     UpdateUserVoteForPublication,
     RemoveUserVoteForPublication
 )
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
+@idempotent
 async def create_publication(
         schema: PublicationCreate,
         current_user: CurrentUser,
@@ -25,13 +32,54 @@ async def create_publication(
 
 @router.get("", status_code=status.HTTP_200_OK)
 async def get_publications(
+        response: Response,
+        user_id: OptionalUserId,
         use_case: GetPublicationList = Depends(),
         params: ItemQueryParams = Depends(),
+        if_none_match: str | None = Header(None),
+        if_modified_since: str | None = Header(None),
 ):
-    return await use_case(params)
+    return await use_case(params, user_id, if_none_match, if_modified_since, response)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_publications(
+        after_id: int = Query(0, ge=0),
+        accept_encoding: str | None = Header(None),
+        use_case: ExportPublications = Depends(),
+):
+    return await use_case(after_id, accept_encoding)
+
+
+@router.get("/live", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def stream_publication_counts(
+        ids: list[int] = Query([]),
+        use_case: StreamPublicationCounts = Depends(),
+):
+    return await use_case(ids)
+
+
+@router.get("/{id}", status_code=status.HTTP_200_OK)
+async def get_publication(
+        response: Response,
+        publication_id: int = Path(..., alias="id"),
+        if_none_match: str | None = Header(None),
+        use_case: GetPublication = Depends(),
+):
+    return await use_case(publication_id, if_none_match, response)
+
+
+@router.delete("/{id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_publication(
+        current_user: CurrentUser,
+        publication_id: int = Path(..., alias="id"),
+        use_case: DeletePublication = Depends(),
+):
+    return await use_case(current_user, publication_id)
 
 
 @router.post("/{id}/vote", status_code=status.HTTP_201_CREATED)
+@idempotent
 async def create_vote(
         schema: VoteBase,
         current_user: CurrentUser,
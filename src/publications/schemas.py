@@ -1,9 +1,12 @@
 import datetime
 from enum import Enum
+from typing import Literal
+from functools import lru_cache
 
-from pydantic import ConfigDict
+from pydantic import ConfigDict, Field, SerializeAsAny, create_model
 
-from src.common.schemas import BaseSchema, DefaultResponse
+from src.common.schemas import BaseSchema, DefaultResponse, QueryParams
+from src.publications.constants import TrendingWindow
 from src.users.schemas import UserRead
 
 
@@ -21,12 +24,37 @@ class PublicationRead(PublicationBase):
 
 
 class PublicationReadDetail(PublicationRead):
+    truncated: bool = False  # content is an excerpt, the detail view has all of it
     rating: float | None = 0
     vote_count: int = 0
     creator: UserRead
     created_at: datetime.datetime
 
 
+class PublicationVoteReadDetail(PublicationReadDetail):
+    my_vote: bool | None = None  # the caller's grade, None if they did not vote
+
+
+class PublicationFieldsBase(BaseSchema):
+    model_config = ConfigDict(from_attributes=True)
+
+
+@lru_cache
+def publication_fields_schema(fields: frozenset[str]) -> type[PublicationFieldsBase]:
+    """``PublicationVoteReadDetail`` limited to ``fields`` and the id."""
+    return create_model(
+        "PublicationFieldsRead",
+        __base__=PublicationFieldsBase,
+        **{
+            name: (field.annotation, field)
+            for name, field in PublicationVoteReadDetail.model_fields.items()
+            if name in fields
+            or name == "id"
+            or (name == "truncated" and "content" in fields)
+        },
+    )
+
+
 class VoteBase(BaseSchema):
     model_config = ConfigDict(from_attributes=True)
     grade: bool
@@ -35,12 +63,52 @@ class VoteBase(BaseSchema):
 class OrderBy(str, Enum):
     rating = "rating"
     created_at = "created_at"
+    hot = "hot"
+    best = "best"
+    trending = "trending"
 
 
-class ItemQueryParams(BaseSchema):
-    order_by: OrderBy = OrderBy.rating
+class ItemQueryParams(QueryParams):
+    order_by: OrderBy | None = None  # by relevance when searching, else by rating
     desc: bool = False
     limit: int = 10
+    window: TrendingWindow = TrendingWindow.day  # only used by order_by=trending
+    q: str | None = Field(None, max_length=256)  # full-text search in the content
+    creator_id: int | None = None
+    created_after: datetime.datetime | None = None  # inclusive
+    created_before: datetime.datetime | None = None  # exclusive
+    # comma separated names of PUBLICATION_FIELDS, all of them by default
+    fields: str | None = None
+    excerpt_length: int | None = Field(None, ge=1, le=100_000)
+    expand: Literal["content"] | None = None  # full content instead of excerpts
+
+
+class PublicationSummary(PublicationRead):
+    truncated: bool = False  # content is an excerpt, the detail view has all of it
+    created_at: datetime.datetime
+    rating: int
+    vote_count: int
+    creator_id: int
+
+
+class UserVoteRead(VoteBase):
+    id: int  # pass the last one as ``before`` to get the next page
+    publication: PublicationSummary
+
+
+class UserVotePage(BaseSchema):
+    items: list[UserVoteRead]
+    next_before: int | None
+
+
+class PublicationDeletion(BaseSchema):
+    deleted: int
+    task_id: str | None  # of the purge, None if it could not be queued
+
+
+class UserVoteQueryParams(QueryParams):
+    before: int | None = None
+    limit: int = Field(20, ge=1, le=100)
 
 
 class PublicationListResponse(DefaultResponse):
@@ -48,11 +116,36 @@ class PublicationListResponse(DefaultResponse):
     details: list[PublicationReadDetail]
 
 
+class PublicationFieldsListResponse(DefaultResponse):
+    status: bool = True
+    details: list[SerializeAsAny[PublicationFieldsBase]]  # of publication_fields_schema
+
+
+class PublicationVoteListResponse(DefaultResponse):
+    status: bool = True
+    details: list[PublicationVoteReadDetail]
+
+
+class UserVoteListResponse(DefaultResponse):
+    status: bool = True
+    details: UserVotePage
+
+
+class PublicationDetailResponse(DefaultResponse):
+    status: bool = True
+    details: PublicationReadDetail
+
+
 class PublicationResponse(DefaultResponse):
     status: bool = True
     details: PublicationRead
 
 
+class PublicationDeletionResponse(DefaultResponse):
+    status: bool = True
+    details: PublicationDeletion
+
+
 class VoteResponse(DefaultResponse):
     status: bool = True
     details: VoteBase
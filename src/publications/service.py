@@ -1,9 +1,69 @@
-from sqlalchemy import func, select, update, delete, case
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Collection
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    ARRAY,
+    JSON,
+    BigInteger,
+    Float,
+    Integer,
+    Select,
+    any_,
+    bindparam,
+    cast,
+    func,
+    literal_column,
+    select,
+    update,
+    delete,
+    case,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased
+from sqlalchemy.orm import Session, aliased
+
+from src.config import settings
+from src.database import remove_by_id
+from src.publications.constants import (
+    HOT_EPOCH,
+    HOT_GRAVITY,
+    WILSON_Z,
+    SEARCH_CONFIG,
+    EXPORT_CHUNK_SIZE,
+    PURGE_BATCH_SIZE,
+    PUBLICATION_FIELDS,
+    VOTE_FIELDS,
+    VOTE_BUCKETS_HOURLY_FOR,
+    VOTE_BUCKETS_KEPT_FOR,
+    TrendingWindow,
+)
+from src.publications.models import (
+    ChangeVersion,
+    Publication,
+    PublicationScore,
+    PublicationVoteBucket,
+    PublicationVoteShard,
+    StalePublicationScore,
+    Vote,
+)
+from src.users import service as users_service
+from src.users.models import StaleUserStats, User
+
+# pg advisory lock key held while the score snapshot is being refreshed
+SCORES_REFRESH_LOCK = 0x5C0E5
+# and while sharded vote totals are being folded into their publications
+VOTE_SHARDS_COMPACT_LOCK = 0x5A4D5
+
+# change_versions rows of everything GET /publications can return, writers
+# bump one picked at random so they rarely wait on each other's row lock
+LISTING_VERSION = "publications"
+LISTING_VERSION_SLOTS = 16
 
-from src.publications.models import Publication, Vote
-from src.users.models import User
+# publications not deleted, every read is limited to them
+VISIBLE = Publication.deleted_at.is_(None)
 
 
 async def create_publication(
@@ -18,15 +78,278 @@ async def get_publication_by_id(
         session: AsyncSession, id: int
 ) -> Publication | None:
     publication = await session.scalar(
-        select(Publication).where(Publication.id == id)
+        select(Publication).where(Publication.id == id, VISIBLE)
     )
     return publication
 
 
-async def get_publications(
-        session: AsyncSession, order_by: str, desc: bool, limit: int
+async def get_listing_version(session: AsyncSession):
+    """The listing version and when it last changed.
+
+    The sum of the slots only moves once a bump commits. A bump committing
+    after a later one can be older than the latest changed_at, but only by
+    its own commit, which Last-Modified's one second resolution hides anyway.
+    """
+    version = await session.execute(
+        select(
+            cast(func.sum(ChangeVersion.version), BigInteger).label("version"),
+            func.max(ChangeVersion.changed_at).label("changed_at"),
+        )
+        .where(ChangeVersion.name == LISTING_VERSION)
+    )
+    return version.one()
+
+
+def _bump_listing_version_stmt():
+    stmt = insert(ChangeVersion).values(
+        name=LISTING_VERSION,
+        slot=random.randrange(LISTING_VERSION_SLOTS),
+        version=1,
+        changed_at=func.clock_timestamp(),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[ChangeVersion.name, ChangeVersion.slot],
+        set_={
+            "version": ChangeVersion.version + 1,
+            # taken once the slot is locked, after any bump queued before
+            "changed_at": func.clock_timestamp(),
+        },
+    )
+
+
+async def bump_listing_version(session: AsyncSession) -> None:
+    """Invalidate listing validators when the caller's transaction commits.
+
+    Run it as the last statement before the commit: the slot stays locked
+    until then, and readers only see the new version together with the
+    change it stands for.
+    """
+    await session.flush()  # hold the slot lock for the commit only
+    await session.execute(_bump_listing_version_stmt())
+
+
+async def bump_listing_version_for_vote(session: AsyncSession) -> None:
+    """bump_listing_version, or nothing if the vote went to a shard.
+
+    Sharded votes leave it to their compaction, which bumps it once for all
+    of them.
+    """
+    if not settings.VOTE_COUNTER_SHARDS:
+        await bump_listing_version(session)
+
+
+def _stored_vote_totals():
+    """Upvotes and downvotes of a publication, counting those still in shards."""
+    upvotes, downvotes = Publication.upvotes, Publication.downvotes
+    if not settings.VOTE_COUNTER_SHARDS:
+        return upvotes, downvotes
+
+    def sharded(column):
+        return (
+            select(func.coalesce(func.sum(column), 0))
+            .where(PublicationVoteShard.publication_id == Publication.id)
+            .scalar_subquery()
+        )
+
+    return (
+        upvotes + sharded(PublicationVoteShard.upvotes),
+        downvotes + sharded(PublicationVoteShard.downvotes),
+    )
+
+
+async def get_publication_version(
+        session: AsyncSession, id: int
 ):
-    subq = select(
+    """Just the columns a publication's ETag is derived from."""
+    upvotes, downvotes = _stored_vote_totals()
+    version = await session.execute(
+        select(
+            Publication.updated_at,
+            upvotes.label("upvotes"),
+            downvotes.label("downvotes"),
+        )
+        .where(Publication.id == id, VISIBLE)
+    )
+    return version.one_or_none()
+
+
+async def get_publication_detail(
+        session: AsyncSession, id: int
+):
+    creator_alias = aliased(User, name='creator')
+    upvotes, downvotes = _stored_vote_totals()
+    publication = await session.execute(
+        select(
+            Publication.id,
+            Publication.content,
+            Publication.created_at,
+            Publication.updated_at,
+            upvotes.label("upvotes"),
+            downvotes.label("downvotes"),
+            (upvotes - downvotes).label("rating"),
+            (upvotes + downvotes).label("vote_count"),
+            creator_alias,
+        )
+        .join(creator_alias, creator_alias.id == Publication.creator_id)
+        .where(Publication.id == id, VISIBLE)
+    )
+    return publication.one_or_none()
+
+
+async def hide_publications(session: AsyncSession, *conditions):
+    """Mark the visible publications matching ``conditions`` as deleted.
+
+    Returns the ids and creators of the hidden rows, their votes are left
+    for ``purge_publication``.
+    """
+    hidden = await session.execute(
+        update(Publication)
+        .where(VISIBLE, *conditions)
+        .values(deleted_at=func.now())
+        .returning(Publication.id, Publication.creator_id)
+    )
+    return hidden.all()
+
+
+def deleted_publication_ids(
+        session: Session,
+        publication_id: int | None = None,
+        creator_id: int | None = None,
+) -> list[int]:
+    """Ids of deleted publications still to purge, or only one or a creator's."""
+    stmt = select(Publication.id).where(Publication.deleted_at.is_not(None))
+    if publication_id is not None:
+        stmt = stmt.where(Publication.id == publication_id)
+    if creator_id is not None:
+        stmt = stmt.where(Publication.creator_id == creator_id)
+    return list(session.scalars(stmt.order_by(Publication.id)))
+
+
+def purge_publication(session: Session, publication_id: int, on_batch=None) -> int:
+    """Delete a deleted publication's votes, then the publication, and commit.
+
+    Votes go PURGE_BATCH_SIZE per transaction with PUBLICATION_PURGE_PAUSE_SECONDS
+    in between, so no lock is held for long and replicas keep up.
+    ``on_batch`` is called with the number of votes deleted so far.
+    Returns that number.
+    """
+    deleted = 0
+    while True:
+        batch = (
+            select(Vote.id)
+            .where(Vote.publication_id == publication_id)
+            .limit(PURGE_BATCH_SIZE)
+        )
+        count = session.execute(
+            delete(Vote).where(Vote.id.in_(batch.scalar_subquery()))
+        ).rowcount
+        deleted += count
+        if count < PURGE_BATCH_SIZE:
+            break
+        session.commit()
+        if on_batch is not None:
+            on_batch(deleted)
+        time.sleep(settings.PUBLICATION_PURGE_PAUSE_SECONDS)
+
+    # the last votes go in the same transaction as the row itself. Locking it
+    # waits for votes still being inserted and makes later ones fail their
+    # foreign key check, so the ones committed meanwhile are deleted here too
+    session.execute(
+        select(Publication.id)
+        .where(Publication.id == publication_id)
+        .with_for_update()
+    )
+    deleted += session.execute(
+        delete(Vote).where(Vote.publication_id == publication_id)
+    ).rowcount
+    session.execute(
+        delete(PublicationVoteBucket)
+        .where(PublicationVoteBucket.publication_id == publication_id)
+    )
+    session.execute(
+        delete(StalePublicationScore)
+        .where(StalePublicationScore.publication_id == publication_id)
+    )
+    remove_by_id(session, Publication, publication_id)
+    session.commit()
+    if on_batch is not None:
+        on_batch(deleted)
+    return deleted
+
+
+def hot_score(rating, created_at):
+    return (
+        func.sign(rating) * func.log(func.greatest(func.abs(rating), 1))
+        + (func.extract("epoch", created_at) - HOT_EPOCH) / HOT_GRAVITY
+    )
+
+
+def wilson_lower_bound(upvotes, downvotes):
+    # n is clamped to 1 so that a publication without votes scores exactly 0
+    n = func.greatest(upvotes + downvotes, 1)
+    p = cast(upvotes, Float) / n
+    z2 = WILSON_Z * WILSON_Z
+    return (
+        p + z2 / (2 * n)
+        - WILSON_Z * func.sqrt((p * (1 - p) + z2 / (4 * n)) / n)
+    ) / (1 + z2 / n)
+
+
+# orderings served straight from an indexed publications column
+PUBLICATION_ORDER_COLUMNS = {
+    "created_at": Publication.created_at,
+    "hot": Publication.hot_score,
+    "best": Publication.best_score,
+}
+
+
+def _search_query(q: str):
+    # websearch syntax: words, "quoted phrases", or, -excluded
+    return func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+
+
+def _as_stored_time(value: datetime) -> datetime:
+    # created_at is stored without a time zone, in UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def publication_filters(
+        q: str | None = None,
+        creator_id: int | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+) -> list:
+    """WHERE clauses on publications narrowing a listing.
+
+    The creation range includes ``created_after`` and excludes
+    ``created_before``.
+    """
+    conditions = []
+    if q:
+        conditions.append(Publication.search_vector.bool_op("@@")(_search_query(q)))
+    if creator_id is not None:
+        conditions.append(Publication.creator_id == creator_id)
+    if created_after is not None:
+        conditions.append(Publication.created_at >= _as_stored_time(created_after))
+    if created_before is not None:
+        conditions.append(Publication.created_at < _as_stored_time(created_before))
+    return conditions
+
+
+def _order_column(order_by: str, desc: bool, q: str | None = None):
+    if order_by == "relevance":
+        # best match first whatever ``desc`` says
+        return func.ts_rank(Publication.search_vector, _search_query(q)).desc()
+    order_column = PUBLICATION_ORDER_COLUMNS.get(order_by)
+    if order_column is not None and desc:
+        return order_column.desc()
+    return order_column
+
+
+def _vote_totals() -> Select:
+    return select(
         Vote.publication_id,
         func.count(Vote.publication_id).label('vote_count'),
         (
@@ -38,41 +361,605 @@ async def get_publications(
                 )
             )
         ).label('rating')
-    ).group_by(Vote.publication_id).subquery()
+    ).group_by(Vote.publication_id)
 
-    creator_alias = aliased(User, name='creator')
-    stmt = (
-        select(
-            Publication.id,
-            Publication.content,
-            Publication.created_at,
-            func.coalesce(subq.c.rating, 0).label("rating"),
-            func.coalesce(subq.c.vote_count, 0).label("vote_count"),
-            creator_alias,
-        ).outerjoin(
-            subq, subq.c.publication_id == Publication.id
-        ).join(
-            creator_alias, creator_alias.id == Publication.creator_id
-        )
+
+def _wants_votes(order_by: str, fields: Collection[str] | None) -> bool:
+    return fields is None or order_by == "rating" or not VOTE_FIELDS.isdisjoint(fields)
+
+
+def _content_columns(excerpt: int | None) -> list:
+    """The content, or its first ``excerpt`` characters and whether it was cut."""
+    if excerpt is None:
+        return [Publication.content, literal_column("false").label("truncated")]
+    # left() only reads the start of a large toasted value
+    return [
+        func.left(Publication.content, excerpt).label("content"),
+        (func.char_length(func.left(Publication.content, excerpt + 1)) > excerpt)
+        .label("truncated"),
+    ]
+
+
+def _publication_rows(
+        votes, fields: Collection[str] | None = None, excerpt: int | None = None
+) -> Select:
+    """Listing columns, all of them unless limited to ``fields``.
+
+    The vote totals are joined when ``votes`` is given. The creator is
+    only selected as ``creator_id``, users are never joined.
+    """
+    wanted = PUBLICATION_FIELDS if fields is None else fields
+    columns = [Publication.id]
+    if "content" in wanted:
+        columns.extend(_content_columns(excerpt))
+    if "created_at" in wanted:
+        columns.append(Publication.created_at)
+    if votes is not None and "rating" in wanted:
+        columns.append(func.coalesce(votes.c.rating, 0).label("rating"))
+    if votes is not None and "vote_count" in wanted:
+        columns.append(func.coalesce(votes.c.vote_count, 0).label("vote_count"))
+    if "creator" in wanted:
+        # the username is filled in by _with_creators
+        columns.append(Publication.creator_id)
+
+    stmt = select(*columns)
+    if votes is not None:
+        stmt = stmt.outerjoin(votes, votes.c.publication_id == Publication.id)
+    return stmt
+
+
+async def _with_creators(session: AsyncSession, rows) -> list[dict]:
+    """``rows`` of _publication_rows with their creator as id and username."""
+    usernames = await users_service.get_usernames(
+        session, {row.creator_id for row in rows}
     )
+    return [
+        {
+            **row._asdict(),
+            "creator": {"id": row.creator_id, "username": usernames[row.creator_id]},
+        }
+        for row in rows
+    ]
+
+
+def get_publications_stmt(
+        order_by: str,
+        desc: bool,
+        limit: int,
+        fields: Collection[str] | None = None,
+        excerpt: int | None = None,
+        **filters,
+) -> Select:
+    votes = _vote_totals()
+    conditions = publication_filters(**filters)
+
+    order_column = page_order = _order_column(order_by, desc, filters.get("q"))
+    if page_order is None and conditions:
+        # rank a filtered subset by its stored vote totals rather than
+        # counting the votes of every publication in it
+        upvotes, downvotes = _stored_vote_totals()
+        rating = upvotes - downvotes
+        page_order = rating.desc() if desc else rating
+    if page_order is not None and limit:
+        # Pick the page from the index first, then read and count votes for
+        # it only. As a CTE the page is computed once.
+        page = (
+            select(Publication.id)
+            .where(VISIBLE, *conditions)
+            .order_by(page_order)
+            .limit(limit)
+            .cte("page")
+        )
+        votes = votes.where(Vote.publication_id.in_(select(page.c.id)))
+        conditions = [Publication.id.in_(select(page.c.id))]
+    elif conditions:
+        votes = votes.where(
+            Vote.publication_id.in_(select(Publication.id).where(*conditions))
+        )
+    subq = votes.subquery() if _wants_votes(order_by, fields) else None
+
+    stmt = _publication_rows(subq, fields, excerpt).where(VISIBLE, *conditions)
     match order_by:
         case "rating":
             if desc:
                 stmt = stmt.order_by(func.coalesce(subq.c.rating, 0).desc())
             else:
                 stmt = stmt.order_by(func.coalesce(subq.c.rating, 0))
-        case "created_at":
+        case _:
+            stmt = stmt.order_by(order_column)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def get_trending_publications_stmt(
+        window: str,
+        desc: bool,
+        limit: int,
+        fields: Collection[str] | None = None,
+        excerpt: int | None = None,
+        **filters,
+) -> Select:
+    """Publications ranked by the net votes they received inside ``window``.
+
+    Only the vote rollups of the window are scanned, the page is picked
+    from them before any publication row is read.
+    """
+    since = func.date_trunc(
+        "hour", func.localtimestamp() - TrendingWindow(window).duration
+    )
+    trending = func.sum(PublicationVoteBucket.votes)
+    ranking = (
+        select(PublicationVoteBucket.publication_id, trending.label("trending"))
+        .where(PublicationVoteBucket.bucket_start >= since)
+        .group_by(PublicationVoteBucket.publication_id)
+        .having(trending > 0)
+        .order_by(
+            trending.desc() if desc else trending, PublicationVoteBucket.publication_id
+        )
+    )
+    conditions = publication_filters(**filters)
+    if conditions:
+        ranking = ranking.where(
+            PublicationVoteBucket.publication_id.in_(
+                select(Publication.id).where(VISIBLE, *conditions)
+            )
+        )
+    else:
+        ranking = ranking.where(
+            PublicationVoteBucket.publication_id.not_in(
+                select(Publication.id).where(Publication.deleted_at.is_not(None))
+            )
+        )
+    if limit:
+        ranking = ranking.limit(limit)
+    # referenced twice, so postgres computes it once
+    ranking = ranking.cte("ranking")
+
+    votes = None
+    if _wants_votes("trending", fields):
+        votes = _vote_totals().where(
+            Vote.publication_id.in_(select(ranking.c.publication_id))
+        ).subquery()
+    stmt = _publication_rows(votes, fields, excerpt).join(
+        ranking, ranking.c.publication_id == Publication.id
+    )
+    order_column = ranking.c.trending.desc() if desc else ranking.c.trending
+    return stmt.order_by(order_column, Publication.id)
+
+
+def get_publication_scores_stmt(
+        order_by: str,
+        desc: bool,
+        limit: int,
+        fields: Collection[str] | None = None,
+        excerpt: int | None = None,
+        **filters,
+) -> Select:
+    creator = func.json_build_object(
+        "id", PublicationScore.creator_id,
+        "username", PublicationScore.creator_username,
+        type_=JSON,
+    ).label("creator")
+    content, truncated = _content_columns(excerpt)
+    columns = {
+        "id": Publication.id,
+        "content": content,
+        "truncated": truncated,
+        "created_at": Publication.created_at,
+        "rating": PublicationScore.rating,
+        "vote_count": PublicationScore.vote_count,
+        "creator": creator,
+    }
+    if fields is not None:
+        wanted = {"id", *fields, *(("truncated",) if "content" in fields else ())}
+        columns = {name: column for name, column in columns.items() if name in wanted}
+    stmt = (
+        select(*columns.values()).join(
+            PublicationScore, PublicationScore.publication_id == Publication.id
+        ).where(VISIBLE, *publication_filters(**filters))
+    )
+    match order_by:
+        case "rating":
             if desc:
-                stmt = stmt.order_by(Publication.created_at.desc())
+                stmt = stmt.order_by(PublicationScore.rating.desc())
             else:
-                stmt = stmt.order_by(Publication.created_at)
+                stmt = stmt.order_by(PublicationScore.rating)
+        case _:
+            stmt = stmt.order_by(_order_column(order_by, desc, filters.get("q")))
     if limit:
         stmt = stmt.limit(limit)
+    return stmt
+
+
+# (window, desc, limit, fields, excerpt, *filters) -> (expires at, rows),
+# per worker, oldest first
+_trending_cache: OrderedDict[tuple, tuple[float, list]] = OrderedDict()
+
+
+def trending_period() -> tuple[int, datetime]:
+    """Number and start of the period a trending page stays the same for.
+
+    Cached pages expire when the period they were computed in ends, and
+    without the cache the hourly rollups move the window once an hour.
+    """
+    length = settings.TRENDING_CACHE_SECONDS or 3600
+    number = int(time.time() // length)
+    return number, datetime.fromtimestamp(number * length, timezone.utc)
+
+
+async def get_trending_publications(
+        session: AsyncSession,
+        window: str,
+        desc: bool,
+        limit: int,
+        fields: frozenset[str] | None = None,
+        excerpt: int | None = None,
+        **filters,
+):
+    key = (
+        TrendingWindow(window), desc, limit, fields, excerpt, *sorted(filters.items())
+    )
+    cached = _trending_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    pubs = await session.execute(
+        get_trending_publications_stmt(window, desc, limit, fields, excerpt, **filters)
+    )
+    rows = pubs.all()
+    if fields is None or "creator" in fields:
+        rows = await _with_creators(session, rows)
+    if settings.TRENDING_CACHE_SECONDS > 0:
+        now = time.monotonic()
+        # expire together with the trending_period() listing ETags include
+        period = settings.TRENDING_CACHE_SECONDS
+        left = period - time.time() % period
+        _trending_cache.pop(key, None)
+        _trending_cache[key] = (now + left, rows)
+        # filters make the key space unbounded, drop expired and oldest pages
+        while _trending_cache and next(iter(_trending_cache.values()))[0] <= now:
+            _trending_cache.popitem(last=False)
+        while len(_trending_cache) > settings.TRENDING_CACHE_SIZE:
+            _trending_cache.popitem(last=False)
+    return rows
+
+
+async def get_publications(
+        session: AsyncSession,
+        order_by: str | None,
+        desc: bool,
+        limit: int,
+        window: str = TrendingWindow.day,
+        q: str | None = None,
+        fields: str | None = None,
+        excerpt_length: int | None = None,
+        expand: str | None = None,
+        **filters,
+):
+    """Rows of a listing, ``filters`` are those of ``publication_filters``.
 
+    ``fields`` is a comma separated subset of PUBLICATION_FIELDS to select,
+    the id is always included. The content is cut to ``excerpt_length``
+    characters (PUBLICATION_EXCERPT_LENGTH by default) unless ``expand``
+    is "content".
+    """
+    filters["q"] = (q or "").strip() or None
+    field_set = frozenset(fields.split(",")) if fields else None
+    excerpt = None
+    if expand != "content":
+        excerpt = excerpt_length or settings.PUBLICATION_EXCERPT_LENGTH
+    if order_by is None:
+        order_by = "relevance" if filters["q"] else "rating"
+    if order_by == "trending":
+        return await get_trending_publications(
+            session, window, desc, limit, field_set, excerpt, **filters
+        )
+    if settings.PUBLICATION_SNAPSHOT:
+        stmt = get_publication_scores_stmt(
+            order_by, desc, limit, field_set, excerpt, **filters
+        )
+        pubs = await session.execute(stmt)
+        return pubs.all()
+    stmt = get_publications_stmt(order_by, desc, limit, field_set, excerpt, **filters)
     pubs = await session.execute(stmt)
+    if field_set is None or "creator" in field_set:
+        return await _with_creators(session, pubs.all())
     return pubs.all()
 
 
+async def mark_score_stale(session: AsyncSession, publication_id: int) -> None:
+    """Have the next refresh recompute the snapshot row of ``publication_id``.
+
+    An existing marker is updated rather than skipped: its row lock makes a
+    refresh deleting it wait for the caller's commit, and so count its votes.
+    """
+    if not settings.PUBLICATION_SNAPSHOT:
+        return
+    stmt = insert(StalePublicationScore).values(publication_id=publication_id)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StalePublicationScore.publication_id],
+            # keep the oldest mark, it is what the refresh reports as staleness
+            set_={"marked_at": StalePublicationScore.marked_at},
+        )
+    )
+
+
+def refresh_publication_scores(session: Session, full: bool = False) -> dict:
+    """Recompute snapshot rows of publications marked stale and commit.
+
+    Everything is rebuilt when ``full`` is set or the snapshot is empty.
+    Readers keep seeing the previous rows until the commit. Returns the
+    number of refreshed rows and the age of the oldest change applied.
+    """
+    if not session.scalar(select(func.pg_try_advisory_xact_lock(SCORES_REFRESH_LOCK))):
+        return {"skipped": True}
+
+    full = full or (
+        session.scalar(select(PublicationScore.publication_id).limit(1)) is None
+    )
+    stale = session.execute(
+        delete(StalePublicationScore).returning(
+            StalePublicationScore.publication_id,
+            func.extract(
+                "epoch", func.localtimestamp() - StalePublicationScore.marked_at
+            ).label("age"),
+        )
+    ).all()
+    ids = [row.publication_id for row in stale]
+    if not full and not ids:
+        session.commit()
+        return {"skipped": False, "full": False, "refreshed": 0, "staleness": 0.0}
+
+    votes = select(
+        Vote.publication_id,
+        func.count(Vote.publication_id).label("vote_count"),
+        func.sum(case((Vote.grade == True, 1), else_=-1)).label("rating"),
+    ).group_by(Vote.publication_id)
+    source = select(
+        Publication.id,
+        Publication.creator_id,
+        User.username,
+    ).join(User, User.id == Publication.creator_id)
+    if not full:
+        votes = votes.where(Vote.publication_id.in_(ids))
+        source = source.where(Publication.id.in_(ids))
+    votes = votes.subquery()
+    source = source.add_columns(
+        func.coalesce(votes.c.rating, 0),
+        func.coalesce(votes.c.vote_count, 0),
+    ).outerjoin(votes, votes.c.publication_id == Publication.id)
+
+    stmt = insert(PublicationScore).from_select(
+        ["publication_id", "creator_id", "creator_username", "rating", "vote_count"],
+        source,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PublicationScore.publication_id],
+        set_={
+            "creator_username": stmt.excluded.creator_username,
+            "rating": stmt.excluded.rating,
+            "vote_count": stmt.excluded.vote_count,
+            "refreshed_at": func.now(),
+        },
+    )
+    upserted = stmt.returning(PublicationScore.publication_id).cte("upserted")
+    refreshed = session.scalar(select(func.count()).select_from(upserted))
+    if refreshed:
+        session.execute(_bump_listing_version_stmt())
+    session.commit()
+
+    return {
+        "skipped": False,
+        "full": full,
+        "refreshed": refreshed,
+        "staleness": float(max((row.age for row in stale), default=0)),
+    }
+
+
+async def update_vote_totals(
+        session: AsyncSession, publication_id: int, upvotes: int, downvotes: int
+) -> None:
+    """Shift the stored vote totals of a publication and recompute its scores.
+
+    With VOTE_COUNTER_SHARDS the shift goes to a shard instead, and the
+    scores follow once compact_vote_shards folds it in.
+    """
+    if settings.VOTE_COUNTER_SHARDS:
+        await _add_to_vote_shard(session, publication_id, upvotes, downvotes)
+        return
+    new_upvotes = Publication.upvotes + upvotes
+    new_downvotes = Publication.downvotes + downvotes
+    await session.execute(
+        update(Publication)
+        .where(Publication.id == publication_id)
+        .values(
+            upvotes=new_upvotes,
+            downvotes=new_downvotes,
+            hot_score=hot_score(new_upvotes - new_downvotes, Publication.created_at),
+            best_score=wilson_lower_bound(new_upvotes, new_downvotes),
+            updated_at=Publication.updated_at,  # votes do not edit the publication
+        )
+    )
+
+
+async def _add_to_vote_shard(
+        session: AsyncSession, publication_id: int, upvotes: int, downvotes: int
+) -> None:
+    stmt = insert(PublicationVoteShard).values(
+        publication_id=publication_id,
+        shard=random.randrange(settings.VOTE_COUNTER_SHARDS),
+        upvotes=upvotes,
+        downvotes=downvotes,
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                PublicationVoteShard.publication_id, PublicationVoteShard.shard
+            ],
+            set_={
+                "upvotes": PublicationVoteShard.upvotes + stmt.excluded.upvotes,
+                "downvotes": PublicationVoteShard.downvotes + stmt.excluded.downvotes,
+            },
+        )
+    )
+
+
+def compact_vote_shards(session: Session) -> dict:
+    """Fold the sharded vote totals into their publications and commit.
+
+    Scores, the current trending bucket and the creators' stats follow the
+    folded votes, and listing validators change if there were any.
+    """
+    locked = session.scalar(
+        select(func.pg_try_advisory_xact_lock(VOTE_SHARDS_COMPACT_LOCK))
+    )
+    if not locked:
+        return {"skipped": True}
+
+    shards = delete(PublicationVoteShard).returning(
+        PublicationVoteShard.publication_id,
+        PublicationVoteShard.upvotes,
+        PublicationVoteShard.downvotes,
+    ).cte("shards")
+    totals = select(
+        shards.c.publication_id,
+        cast(func.sum(shards.c.upvotes), Integer).label("upvotes"),
+        cast(func.sum(shards.c.downvotes), Integer).label("downvotes"),
+    ).group_by(shards.c.publication_id).cte("totals")
+
+    new_upvotes = Publication.upvotes + totals.c.upvotes
+    new_downvotes = Publication.downvotes + totals.c.downvotes
+    folded = (
+        update(Publication)
+        .where(Publication.id == totals.c.publication_id)
+        .values(
+            upvotes=new_upvotes,
+            downvotes=new_downvotes,
+            hot_score=hot_score(new_upvotes - new_downvotes, Publication.created_at),
+            best_score=wilson_lower_bound(new_upvotes, new_downvotes),
+            updated_at=Publication.updated_at,
+        )
+        .returning(Publication.id, Publication.creator_id)
+        .cte("folded")
+    )
+
+    # what record_vote_activity leaves to the compaction, counted in the
+    # current hour; publications purged meanwhile are not folded
+    votes = totals.c.upvotes + totals.c.downvotes
+    activity = insert(PublicationVoteBucket).from_select(
+        ["publication_id", "bucket_start", "votes"],
+        select(
+            totals.c.publication_id,
+            func.date_trunc("hour", func.localtimestamp()),
+            votes,
+        )
+        .join(folded, folded.c.id == totals.c.publication_id)
+        .where(votes != 0),
+    )
+    activity = activity.on_conflict_do_update(
+        index_elements=[
+            PublicationVoteBucket.publication_id, PublicationVoteBucket.bucket_start
+        ],
+        set_={"votes": PublicationVoteBucket.votes + activity.excluded.votes},
+    ).returning(PublicationVoteBucket.publication_id).cte("activity")
+    stale_creators = insert(StaleUserStats).from_select(
+        ["user_id"], select(folded.c.creator_id).distinct()
+    ).on_conflict_do_nothing().returning(StaleUserStats.user_id).cte("stale_creators")
+
+    def count(cte):
+        return select(func.count()).select_from(cte).scalar_subquery()
+
+    result = session.execute(select(
+        count(shards).label("shards"),
+        count(folded).label("publications"),
+        count(activity).label("buckets"),
+        count(stale_creators).label("creators"),
+    )).one()
+    if result.publications:
+        session.execute(_bump_listing_version_stmt())
+    session.commit()
+    return {
+        "skipped": False, "shards": result.shards, "publications": result.publications
+    }
+
+
+async def get_publication_counts(session: AsyncSession, publication_ids: list[int]):
+    """Current rating and vote_count of the visible ``publication_ids``."""
+    upvotes, downvotes = _stored_vote_totals()
+    counts = await session.execute(
+        select(
+            Publication.id,
+            (upvotes - downvotes).label("rating"),
+            (upvotes + downvotes).label("vote_count"),
+        ).where(
+            Publication.id == any_(
+                bindparam("publication_ids", publication_ids, type_=ARRAY(Integer))
+            ),
+            VISIBLE,
+        ).order_by(Publication.id)
+    )
+    return counts.all()
+
+
+async def record_vote_activity(
+        session: AsyncSession, publication_id: int, votes: int
+) -> None:
+    """Add ``votes`` to the current hourly bucket of a publication.
+
+    Nothing to do with VOTE_COUNTER_SHARDS, compact_vote_shards adds them.
+    """
+    if settings.VOTE_COUNTER_SHARDS:
+        return
+    stmt = insert(PublicationVoteBucket).values(
+        publication_id=publication_id,
+        bucket_start=func.date_trunc("hour", func.localtimestamp()),
+        votes=votes,
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                PublicationVoteBucket.publication_id, PublicationVoteBucket.bucket_start
+            ],
+            set_={"votes": PublicationVoteBucket.votes + stmt.excluded.votes},
+        )
+    )
+
+
+def compact_vote_buckets(session: Session) -> dict:
+    """Merge old hourly vote buckets into daily ones, drop expired ones and commit."""
+    now = func.localtimestamp()
+    expired = session.execute(
+        delete(PublicationVoteBucket)
+        .where(PublicationVoteBucket.bucket_start < now - VOTE_BUCKETS_KEPT_FOR)
+    ).rowcount
+
+    day = func.date_trunc("day", PublicationVoteBucket.bucket_start)
+    hourly = delete(PublicationVoteBucket).where(
+        PublicationVoteBucket.bucket_start < now - VOTE_BUCKETS_HOURLY_FOR,
+        PublicationVoteBucket.bucket_start != day,
+    ).returning(
+        PublicationVoteBucket.publication_id,
+        day.label("day"),
+        PublicationVoteBucket.votes,
+    ).cte("hourly")
+    merged = insert(PublicationVoteBucket).from_select(
+        ["publication_id", "bucket_start", "votes"],
+        select(hourly.c.publication_id, hourly.c.day, func.sum(hourly.c.votes))
+        .group_by(hourly.c.publication_id, hourly.c.day),
+    )
+    merged = merged.on_conflict_do_update(
+        index_elements=[
+            PublicationVoteBucket.publication_id, PublicationVoteBucket.bucket_start
+        ],
+        set_={"votes": PublicationVoteBucket.votes + merged.excluded.votes},
+    ).returning(PublicationVoteBucket.publication_id).cte("merged")
+    compacted = session.scalar(select(func.count()).select_from(merged))
+    session.commit()
+    return {"expired": expired, "compacted": compacted}
+
+
 async def create_vote(
         session: AsyncSession, user_id: int, publication_id: int, grade: bool
 ) -> Vote:
@@ -93,17 +980,107 @@ async def get_vote(
     return vote
 
 
+async def get_user_grades(
+        session: AsyncSession, user_id: int, publication_ids: list[int]
+) -> dict[int, bool]:
+    """Grades ``user_id`` gave to any of ``publication_ids``, in one query.
+
+    The ids go in as a single array parameter, so every page size shares
+    one prepared statement, and the (publication_id, user_id) unique index
+    answers it with one index scan.
+    """
+    if not publication_ids:
+        return {}
+    votes = await session.execute(
+        select(Vote.publication_id, Vote.grade).where(
+            Vote.user_id == user_id,
+            Vote.publication_id == any_(
+                bindparam("publication_ids", publication_ids, type_=ARRAY(Integer))
+            ),
+        )
+    )
+    return dict(votes.all())
+
+
+def export_publications_stmt(after_id: int = 0) -> Select:
+    """Every publication after ``after_id`` in id order, totals from the counters."""
+    upvotes, downvotes = _stored_vote_totals()
+    return (
+        select(
+            Publication.id,
+            Publication.content,
+            Publication.created_at,
+            (upvotes - downvotes).label("rating"),
+            (upvotes + downvotes).label("vote_count"),
+            Publication.creator_id,
+        )
+        .where(Publication.id > after_id, VISIBLE)
+        .order_by(Publication.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+
+async def stream_publications(session: AsyncSession, after_id: int = 0):
+    """Yield lists of export rows read through a server-side cursor."""
+    result = await session.stream(export_publications_stmt(after_id))
+    async for rows in result.partitions():
+        yield rows
+
+
+def iter_publications(session: Session, after_id: int = 0):
+    """Blocking counterpart of ``stream_publications``."""
+    yield from session.execute(export_publications_stmt(after_id)).partitions()
+
+
+async def get_user_votes(
+        session: AsyncSession, user_id: int, before: int | None, limit: int
+):
+    """Newest first page of a user's votes with their publications.
+
+    Keyset pagination on the vote id walks ix_votes_user_id_id backwards,
+    so every page costs the same however deep it is.
+    """
+    upvotes, downvotes = _stored_vote_totals()
+    stmt = (
+        select(
+            Vote.id,
+            Vote.grade,
+            Publication.id.label("publication_id"),
+            *_content_columns(settings.PUBLICATION_EXCERPT_LENGTH),
+            Publication.created_at,
+            (upvotes - downvotes).label("rating"),
+            (upvotes + downvotes).label("vote_count"),
+            Publication.creator_id,
+        )
+        .join(Publication, Publication.id == Vote.publication_id)
+        .where(Vote.user_id == user_id, VISIBLE)
+        .order_by(Vote.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        stmt = stmt.where(Vote.id < before)
+    votes = await session.execute(stmt)
+    return votes.all()
+
+
 async def update_vote(
         session: AsyncSession,
         user_id: int,
         publication_id: int,
         grade: bool
 ) -> Vote | None:
+    """Change the grade of a vote, returning it only if the grade changed.
+
+    The grade check is part of the UPDATE, so of two concurrent requests
+    for the same change only the first gets the row back and shifts the
+    totals.
+    """
     vote = await session.scalar(
         update(Vote).values(grade=grade)
         .where(
             Vote.publication_id == publication_id,
-            Vote.user_id == user_id
+            Vote.user_id == user_id,
+            Vote.grade != grade,
         ).returning(Vote)
     )
     return vote
@@ -113,7 +1090,8 @@ async def remove_vote(
         session: AsyncSession,
         user_id: int,
         publication_id: int,
-):
+) -> Vote | None:
+    """Delete a vote, returning it or None if it was already gone."""
     vote = await session.scalar(
         delete(Vote)
         .where(
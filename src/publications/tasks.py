@@ -0,0 +1,105 @@
+import logging
+import time
+from datetime import timedelta
+
+from celery import shared_task
+
+from src.config import settings
+from src.database.engine import sync_session
+from src.publications.service import (
+    compact_vote_buckets,
+    compact_vote_shards,
+    deleted_publication_ids,
+    purge_publication,
+    refresh_publication_scores,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_scores(full: bool = False) -> dict:
+    started = time.perf_counter()
+    with sync_session() as session:
+        result = refresh_publication_scores(session, full=full)
+    result["duration"] = time.perf_counter() - started
+    if not result["skipped"]:
+        logger.info(
+            "publication_scores refreshed: %(refreshed)s rows in %(duration).3fs, "
+            "full=%(full)s, staleness %(staleness).2fs", result,
+        )
+    return result
+
+
+@shared_task
+def compact_trending_buckets() -> dict:
+    with sync_session() as session:
+        return compact_vote_buckets(session)
+
+
+@shared_task
+def compact_vote_counters() -> dict:
+    with sync_session() as session:
+        return compact_vote_shards(session)
+
+
+@shared_task(bind=True)
+def purge_publications(
+        self, publication_id: int | None = None, creator_id: int | None = None
+) -> dict:
+    """Purge deleted publications, all of them unless limited to one or a creator's.
+
+    Progress is published as the PROGRESS state of the task.
+    """
+    progress = {"publications": 0, "purged": 0, "votes": 0}
+    with sync_session() as session:
+        ids = deleted_publication_ids(session, publication_id, creator_id)
+        progress["publications"] = len(ids)
+        for id_ in ids:
+            purged_votes = progress["votes"]
+
+            def report(votes: int) -> None:
+                progress["votes"] = purged_votes + votes
+                self.update_state(state="PROGRESS", meta=progress)
+
+            purge_publication(session, id_, on_batch=report)
+            progress["purged"] += 1
+            logger.info(
+                "publication %s purged, %s of %s done, %s votes deleted",
+                id_, progress["purged"], progress["publications"], progress["votes"],
+            )
+    return progress
+
+
+task_settings = {
+    'compact-trending-buckets-every-hour': {
+        'task': 'src.publications.tasks.compact_trending_buckets',
+        'schedule': timedelta(hours=1),
+    },
+    # also scheduled without VOTE_COUNTER_SHARDS, to fold what is left
+    # after turning it off
+    'compact-vote-counters': {
+        'task': 'src.publications.tasks.compact_vote_counters',
+        'schedule': timedelta(seconds=settings.VOTE_SHARDS_COMPACT_SECONDS),
+    },
+    # picks up deletions whose own purge task was lost
+    'purge-deleted-publications-every-hour': {
+        'task': 'src.publications.tasks.purge_publications',
+        'schedule': timedelta(hours=1),
+    },
+}
+
+snapshot_task_settings = {
+    'refresh-publication-scores': {
+        'task': 'src.publications.tasks.refresh_scores',
+        'schedule': timedelta(seconds=settings.PUBLICATION_SNAPSHOT_REFRESH_SECONDS),
+    },
+    'rebuild-publication-scores-every-day': {
+        'task': 'src.publications.tasks.refresh_scores',
+        'schedule': timedelta(days=1),
+        'kwargs': {'full': True},
+    },
+}
+
+if settings.PUBLICATION_SNAPSHOT:
+    task_settings.update(snapshot_task_settings)
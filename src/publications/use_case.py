@@ -1,32 +1,274 @@
+import logging
+from functools import lru_cache
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
 from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
 
+from src.common.caching import (
+    etag_matches,
+    http_date,
+    is_not_modified,
+    make_etag,
+    not_modified,
+)
 from src.common.use_case import BaseAsyncUseCase
-from src.publications import service
-from src.publications.exceptions import AlreadyVoted, PublicationDoesNotExist, VoteDoesNotExist
+from src.config import settings
+from src.outbox import service as outbox
+from src.publications import export, live, service
+from src.publications.constants import (
+    PUBLICATION_CREATED,
+    PUBLICATION_DELETED,
+    PUBLICATION_FIELDS,
+    VOTE_CREATED,
+    VOTE_UPDATED,
+    VOTE_REMOVED,
+)
+from src.publications.exceptions import (
+    AlreadyVoted,
+    InvalidWatchList,
+    NotPublicationCreator,
+    PublicationDoesNotExist,
+    PublicationNotFound,
+    UnknownPublicationField,
+    VoteDoesNotExist,
+)
 from src.publications.schemas import (
     PublicationCreate,
     VoteBase,
     PublicationListResponse,
     PublicationReadDetail,
+    PublicationVoteListResponse,
+    PublicationVoteReadDetail,
     VoteResponse,
-    PublicationResponse, ItemQueryParams
+    PublicationResponse, ItemQueryParams,
+    PublicationDetailResponse,
+    PublicationFieldsListResponse,
+    PublicationDeletion,
+    PublicationDeletionResponse,
+    publication_fields_schema,
 )
+from src.publications.models import Publication
+from src.users import service as users_service
+from src.users.exceptions import UserNotFound
+from src.users.models import User
+
+logger = logging.getLogger(__name__)
 
 
 class CreatePublication(BaseAsyncUseCase):
     async def __call__(self, user_id: int, in_: PublicationCreate):
         pub = await service.create_publication(self.session, user_id, in_.content)
+        await self.session.flush()
+        await service.mark_score_stale(self.session, pub.id)
+        await outbox.add_event(
+            self.session, PUBLICATION_CREATED, pub.id,
+            publication_id=pub.id, creator_id=user_id,
+        )
+        await service.bump_listing_version(self.session)
         await self.session.commit()
         return PublicationResponse(msg="Publication created successfully.", details=pub)
 
 
 class GetPublicationList(BaseAsyncUseCase):
     _pubs_adapter = TypeAdapter(list[PublicationReadDetail])
+    _voted_pubs_adapter = TypeAdapter(list[PublicationVoteReadDetail])
+
+    async def __call__(
+            self,
+            params: ItemQueryParams,
+            user_id: int | None = None,
+            if_none_match: str | None = None,
+            if_modified_since: str | None = None,
+            response: Response | None = None,
+    ):
+        fields = None
+        if params.fields:
+            fields = frozenset(params.fields.split(","))
+            if not fields <= PUBLICATION_FIELDS:
+                raise UnknownPublicationField()
+            if user_id is None:
+                fields -= {"my_vote"}
+
+        # read the version before the rows: a write committing in between
+        # then only costs clients one extra download, never a stale 304
+        version = await service.get_listing_version(self.session)
+        etag_parts = [version.version, params.model_dump(), user_id]
+        last_modified = version.changed_at
+        if params.order_by == "trending":
+            # the page also changes when the window slides or a cached page expires
+            period, period_start = service.trending_period()
+            etag_parts.append(period)
+            last_modified = max(last_modified, period_start)
+        headers = {
+            "ETag": make_etag(*etag_parts),
+            "Last-Modified": http_date(last_modified),
+            "Cache-Control": self._cache_control(user_id),
+            "Vary": "Authorization",
+        }
+        if is_not_modified(
+                if_none_match, if_modified_since, headers["ETag"], last_modified
+        ):
+            return not_modified(headers)
+        if response is not None:
+            response.headers.update(headers)
 
-    async def __call__(self, params: ItemQueryParams):
         pubs = await service.get_publications(self.session, **params.model_dump())
-        details = self._pubs_adapter.validate_python(pubs, from_attributes=True)
-        return PublicationListResponse(msg="Publications successfully received.", details=details)
+        if fields is not None:
+            adapter = self._fields_adapter(fields)
+            details = adapter.validate_python(pubs, from_attributes=True)
+            if "my_vote" in fields:
+                await self._add_my_votes(user_id, details)
+            return PublicationFieldsListResponse(
+                msg="Publications successfully received.", details=details
+            )
+        if user_id is None:
+            details = self._pubs_adapter.validate_python(pubs, from_attributes=True)
+            return PublicationListResponse(
+                msg="Publications successfully received.", details=details
+            )
+
+        details = self._voted_pubs_adapter.validate_python(pubs, from_attributes=True)
+        await self._add_my_votes(user_id, details)
+        return PublicationVoteListResponse(
+            msg="Publications successfully received.", details=details
+        )
+
+    async def _add_my_votes(self, user_id: int, details: list) -> None:
+        grades = await service.get_user_grades(
+            self.session, user_id, [pub.id for pub in details]
+        )
+        for pub in details:
+            pub.my_vote = grades.get(pub.id)
+
+    @staticmethod
+    @lru_cache
+    def _fields_adapter(fields: frozenset[str]) -> TypeAdapter:
+        return TypeAdapter(list[publication_fields_schema(fields)])
+
+    @staticmethod
+    def _cache_control(user_id: int | None) -> str:
+        if user_id is not None:
+            return "private, no-cache"  # carries the caller's votes
+        return (
+            f"public, max-age={settings.LIST_CACHE_MAX_AGE}, "
+            f"stale-while-revalidate={settings.LIST_CACHE_STALE_WHILE_REVALIDATE}"
+        )
+
+
+def publication_etag(id: int, version) -> str:
+    return make_etag(id, version.updated_at, version.upvotes, version.downvotes)
+
+
+class GetPublication(BaseAsyncUseCase):
+    async def __call__(self, id: int, if_none_match: str | None, response: Response):
+        if if_none_match:
+            # answer revalidations from the version columns alone
+            version = await service.get_publication_version(self.session, id)
+            if version is None:
+                raise PublicationNotFound()
+            etag = publication_etag(id, version)
+            if etag_matches(if_none_match, etag):
+                return not_modified({"ETag": etag, "Cache-Control": "no-cache"})
+
+        pub = await service.get_publication_detail(self.session, id)
+        if pub is None:
+            raise PublicationNotFound()
+        response.headers["ETag"] = publication_etag(id, pub)
+        response.headers["Cache-Control"] = "no-cache"
+        return PublicationDetailResponse(
+            msg="Publication successfully received.", details=pub
+        )
+
+
+class ExportPublications(BaseAsyncUseCase):
+    async def __call__(self, after_id: int = 0, accept_encoding: str | None = None):
+        # FastAPI keeps the session open until the response has been sent
+        body = export.ndjson_stream(service.stream_publications(self.session, after_id))
+        headers = {"Vary": "Accept-Encoding"}
+        if export.accepts_gzip(accept_encoding):
+            body = export.gzip_stream(body)
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            body, media_type="application/x-ndjson", headers=headers
+        )
+
+
+def schedule_purge(**selector) -> str | None:
+    """Queue the purge of deleted publications, return the task id.
+
+    Blocks on the broker, run it in a thread. A purge that cannot be queued
+    is left to the hourly one.
+    """
+    from src.celery import app  # only the workers that delete need celery
+
+    try:
+        return app.send_task(
+            "src.publications.tasks.purge_publications", kwargs=selector
+        ).id
+    except Exception:
+        logger.exception("could not queue the purge of %s", selector)
+        return None
+
+
+class _DeletePublications(BaseAsyncUseCase):
+    async def _delete(self, *conditions, **selector) -> PublicationDeletionResponse:
+        """Hide the publications at once and leave their votes to a purge task."""
+        hidden = await service.hide_publications(self.session, *conditions)
+        await outbox.add_events(self.session, PUBLICATION_DELETED, [
+            (pub.id, {"publication_id": pub.id, "creator_id": pub.creator_id})
+            for pub in hidden
+        ])
+        if hidden:
+            await service.bump_listing_version(self.session)
+        await self.session.commit()
+
+        task_id = None
+        if hidden:
+            task_id = await run_in_threadpool(schedule_purge, **selector)
+        return PublicationDeletionResponse(
+            msg="Publications deleted.",
+            details=PublicationDeletion(deleted=len(hidden), task_id=task_id),
+        )
+
+
+class DeletePublication(_DeletePublications):
+    async def __call__(
+            self, user: User, publication_id: int
+    ) -> PublicationDeletionResponse:
+        publication = await service.get_publication_by_id(self.session, publication_id)
+        if publication is None:
+            raise PublicationNotFound()
+        if publication.creator_id != user.id and not user.is_admin:
+            raise NotPublicationCreator()
+        return await self._delete(
+            Publication.id == publication_id, publication_id=publication_id
+        )
+
+
+class DeleteUserPublications(_DeletePublications):
+    async def __call__(self, user_id: int) -> PublicationDeletionResponse:
+        if await users_service.get_user_by_id(self.session, user_id) is None:
+            raise UserNotFound()
+        return await self._delete(Publication.creator_id == user_id, creator_id=user_id)
+
+
+class StreamPublicationCounts(BaseAsyncUseCase):
+    async def __call__(self, ids: list[int]) -> StreamingResponse:
+        ids = frozenset(ids)
+        if not 0 < len(ids) <= settings.LIVE_MAX_IDS:
+            raise InvalidWatchList()
+        initial = await service.get_publication_counts(self.session, list(ids))
+        # the stream outlives the request, give the connection back now
+        await self.session.close()
+        initial = [row._asdict() for row in initial]
+        body = live.stream_counts(live.Subscriber(ids), initial)
+        return StreamingResponse(
+            body,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
 
 class VotedForPublication(BaseAsyncUseCase):
@@ -50,40 +292,75 @@ class VotedForPublication(BaseAsyncUseCase):
             publication_id=publication_id,
             grade=in_.grade
         )
+        await service.update_vote_totals(
+            self.session, publication_id,
+            upvotes=int(in_.grade), downvotes=int(not in_.grade),
+        )
+        await service.record_vote_activity(self.session, publication_id, votes=1)
+        await outbox.add_event(
+            self.session, VOTE_CREATED, publication_id,
+            publication_id=publication_id, user_id=user_id, grade=in_.grade,
+        )
+        await service.mark_score_stale(self.session, publication_id)
+        await service.bump_listing_version_for_vote(self.session)
         await self.session.commit()
+        await live.publish_change(publication_id)
         return VoteResponse(msg="Voted successfully.", details=vote)
 
 
 class UpdateUserVoteForPublication(BaseAsyncUseCase):
     async def __call__(self, user_id: int, publication_id: int, in_: VoteBase):
-        vote_id_db = await service.get_vote(
-            self.session, user_id=user_id, publication_id=publication_id
-        )
-        if vote_id_db is None:
-            raise VoteDoesNotExist()
-
         vote = await service.update_vote(
             self.session,
             user_id=user_id,
             publication_id=publication_id,
             grade=in_.grade
         )
+        if vote is None:
+            vote = await service.get_vote(
+                self.session, user_id=user_id, publication_id=publication_id
+            )
+            if vote is None:
+                raise VoteDoesNotExist()
+            # the grade is already in_.grade, nothing to shift
+            return VoteResponse(msg="Vote has been updated.", details=vote)
+
+        shift = 1 if in_.grade else -1
+        await service.update_vote_totals(
+            self.session, publication_id, upvotes=shift, downvotes=-shift
+        )
+        await outbox.add_event(
+            self.session, VOTE_UPDATED, publication_id,
+            publication_id=publication_id, user_id=user_id, grade=in_.grade,
+        )
+        await service.mark_score_stale(self.session, publication_id)
+        await service.bump_listing_version_for_vote(self.session)
         await self.session.commit()
+        await live.publish_change(publication_id)
         return VoteResponse(msg="Vote has been updated.", details=vote)
 
 
 class RemoveUserVoteForPublication(BaseAsyncUseCase):
     async def __call__(self, user_id: int, publication_id: int):
-        vote_id_db = await service.get_vote(
-            self.session, user_id=user_id, publication_id=publication_id
-        )
-        if vote_id_db is None:
-            raise VoteDoesNotExist()
-
         vote = await service.remove_vote(
             self.session,
             user_id=user_id,
             publication_id=publication_id,
         )
+        if vote is None:
+            raise VoteDoesNotExist()
+
+        await service.update_vote_totals(
+            self.session, publication_id,
+            upvotes=-int(vote.grade), downvotes=-int(not vote.grade)
+        )
+        await service.record_vote_activity(self.session, publication_id, votes=-1)
+        await outbox.add_event(
+            self.session, VOTE_REMOVED, publication_id,
+            publication_id=publication_id, user_id=user_id, grade=vote.grade,
+        )
+        await service.mark_score_stale(self.session, publication_id)
+        await service.bump_listing_version_for_vote(self.session)
         await self.session.commit()
+        await live.publish_change(publication_id)
         return VoteResponse(msg="Vote has been removed.", details=vote)
@@ -0,0 +1,81 @@
+"""Warm a worker up on the most requested listings before it serves traffic.
+
+Every configured listing runs once on each pooled connection at the same
+time. That opens the pool, fills asyncpg's per-connection prepared
+statement cache and SQLAlchemy's compiled cache, builds the lazy parts of
+the pydantic validators and, for trending listings, the per-worker page
+cache.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config import settings
+from src.database import engine
+from src.publications import service
+from src.publications.schemas import ItemQueryParams
+from src.publications.use_case import GetPublicationList
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupState:
+    ready: bool = False
+    error: str | None = None
+    details: dict = field(default_factory=dict)
+
+
+state = WarmupState()
+
+
+def parse_listings(listings: list[str]) -> list[ItemQueryParams]:
+    return [ItemQueryParams(**dict(parse_qsl(query))) for query in listings]
+
+
+async def _warm_connection(
+        session_factory: async_sessionmaker, listings: list[ItemQueryParams]
+):
+    async with session_factory() as session:
+        for params in listings:
+            pubs = await service.get_publications(session, **params.model_dump())
+            GetPublicationList._pubs_adapter.validate_python(pubs, from_attributes=True)
+
+
+async def warm_up(session_factory: async_sessionmaker | None = None) -> bool:
+    """Run the WARMUP_LISTINGS, record the outcome in ``state`` and return it."""
+    session_factory = session_factory or engine.async_session
+    listings = parse_listings(settings.WARMUP_LISTINGS)
+    connections = session_factory.kw["bind"].pool.size()
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(
+                _warm_connection(session_factory, listings) for _ in range(connections)
+            )),
+            timeout=settings.WARMUP_TIMEOUT_SECONDS,
+        )
+    except Exception as exc:
+        logger.warning("warm-up failed: %r", exc)
+        state.ready, state.error = False, repr(exc)
+        return False
+
+    state.ready, state.error = True, None
+    state.details = {
+        "listings": len(listings),
+        "connections": connections,
+        "duration": time.perf_counter() - started,
+    }
+    logger.info("warm-up done: %(listings)s listings on %(connections)s connections "
+                "in %(duration).3fs", state.details)
+    return True
+
+
+async def keep_warming_up() -> None:
+    """Retry a failed warm-up until it succeeds; the worker serves meanwhile."""
+    while not await warm_up():
+        await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
@@ -1,4 +1,4 @@
-from src.common.exceptions import BadRequest
+from src.common.exceptions import BadRequest, NotFound
 
 
 class EmailTaken(BadRequest):
@@ -7,3 +7,7 @@ class EmailTaken(BadRequest):
 
 class UsernameTaken(BadRequest):
     DETAIL = "Username is already taken."
+
+
+class UserNotFound(NotFound):
+    DETAIL = "User not found"
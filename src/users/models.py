@@ -1,10 +1,14 @@
-from sqlalchemy.orm import mapped_column
+from datetime import datetime
+
+from sqlalchemy.orm import mapped_column, Mapped
 import bcrypt
 from sqlalchemy import (
     Boolean,
     String,
     LargeBinary,
-    Integer
+    Integer,
+    ForeignKey,
+    func,
 )
 
 from src.database import Base
@@ -26,3 +30,30 @@ class User(Base):
     def check_password(self, password: str) -> bool:
         password_bytes = bytes(password, "utf-8")
         return bcrypt.checkpw(password_bytes, self.password)
+
+
+class UserStats(Base):
+    """Periodically refreshed totals of a creator's publications."""
+    __tablename__ = "user_stats"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    publication_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    votes_received: Mapped[int] = mapped_column(Integer, nullable=False)
+    rating: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_publication_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_published_at: Mapped[datetime] = mapped_column(nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+
+class StaleUserStats(Base):
+    """Creators whose stats row must be recomputed on the next refresh."""
+    __tablename__ = "stale_user_stats"
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
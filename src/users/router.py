@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Path, Response
 from fastapi import status
 
-from src.users.schemas import UserCreate, UserResponse
-from src.users.use_case import CreateUser, GetCurrentUser
+from src.auth.service import AdminUser, CurrentUser
+from src.common.idempotency import IdempotentRoute, idempotent
+from src.publications.schemas import (
+    PublicationDeletionResponse,
+    UserVoteListResponse,
+    UserVoteQueryParams,
+)
+from src.publications.use_case import DeleteUserPublications
+from src.users.schemas import UserCreate, UserResponse, UserStatsResponse
+from src.users.use_case import CreateUser, GetCurrentUser, GetUserStats, GetUserVotes
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 
 @router.post("", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
+@idempotent(scope_field="username")
 async def register_user(
         user_in: UserCreate, use_case: CreateUser = Depends(),
 ):
@@ -17,3 +26,38 @@ async def register_user(
 @router.get("/me", status_code=status.HTTP_200_OK, response_model=UserResponse)
 async def get_me(use_case: GetCurrentUser = Depends()):
     return use_case()
+
+
+@router.get(
+    "/me/votes", status_code=status.HTTP_200_OK, response_model=UserVoteListResponse
+)
+async def get_my_votes(
+        current_user: CurrentUser,
+        use_case: GetUserVotes = Depends(),
+        params: UserVoteQueryParams = Depends(),
+):
+    return await use_case(current_user.id, params)
+
+
+@router.get(
+    "/{id}/stats", status_code=status.HTTP_200_OK, response_model=UserStatsResponse
+)
+async def get_user_stats(
+        response: Response,
+        user_id: int = Path(..., alias="id"),
+        use_case: GetUserStats = Depends(),
+):
+    return await use_case(user_id, response)
+
+
+@router.delete(
+    "/{id}/publications",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=PublicationDeletionResponse,
+)
+async def delete_user_publications(
+        admin: AdminUser,
+        user_id: int = Path(..., alias="id"),
+        use_case: DeleteUserPublications = Depends(),
+):
+    return await use_case(user_id)
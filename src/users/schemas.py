@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import Field, ConfigDict
 from src.common.schemas import BaseSchema, DefaultResponse
 
@@ -18,3 +20,21 @@ class UserRead(UserBase):
 class UserResponse(DefaultResponse):
     status: bool = True
     details: UserRead
+
+
+class LastPublication(BaseSchema):
+    id: int
+    created_at: datetime
+
+
+class UserStatsRead(BaseSchema):
+    user_id: int
+    publication_count: int = 0
+    votes_received: int = 0
+    rating: int = 0
+    last_publication: LastPublication | None = None
+
+
+class UserStatsResponse(DefaultResponse):
+    status: bool = True
+    details: UserStatsRead
@@ -1,8 +1,25 @@
-from sqlalchemy import select
+import time
+from collections import OrderedDict
+
+from sqlalchemy import ARRAY, Integer, Row, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from src.config import settings
+from src.publications.models import Publication
 from src.users.schemas import UserCreate
-from src.users.models import User
+from src.users.models import StaleUserStats, User, UserStats
+
+# pg advisory lock key held while user stats are being refreshed
+STATS_REFRESH_LOCK = 0x57A75
+
+# user id -> username of recently listed creators, per worker, least
+# recently used first. Usernames never change, so entries stay valid.
+_usernames: OrderedDict[int, str] = OrderedDict()
+
+# user id -> (expires at, stats row), per worker, oldest first
+_stats_cache: OrderedDict[int, tuple[float, Row]] = OrderedDict()
 
 
 async def create_user(session: AsyncSession, user_in: UserCreate, ) -> User | None:
@@ -24,3 +41,131 @@ async def get_user_by_username(session: AsyncSession, username: str) -> User | N
         select(User).where(User.username == username)
     )
     return user
+
+
+async def get_usernames(session: AsyncSession, user_ids: set[int]) -> dict[int, str]:
+    """Usernames of ``user_ids``, the ones not cached yet loaded in one query."""
+    usernames = {}
+    for user_id in user_ids:
+        username = _usernames.get(user_id)
+        if username is not None:
+            _usernames.move_to_end(user_id)
+            usernames[user_id] = username
+    missing = [user_id for user_id in user_ids if user_id not in usernames]
+    if missing:
+        rows = await session.execute(
+            select(User.id, User.username).where(
+                User.id == any_(bindparam("user_ids", missing, type_=ARRAY(Integer)))
+            )
+        )
+        for user_id, username in rows:
+            usernames[user_id] = _usernames[user_id] = username
+        while len(_usernames) > settings.CREATOR_CACHE_SIZE:
+            _usernames.popitem(last=False)
+    return usernames
+
+
+async def get_user_stats(session: AsyncSession, user_id: int) -> Row | None:
+    """The stats row of ``user_id``, None if there is no such user.
+
+    Stats columns are null for users without publications. Rows are reused
+    for USER_STATS_CACHE_SECONDS, they only change on refreshes anyway.
+    """
+    cached = _stats_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    stats = await session.execute(
+        select(
+            User.id,
+            UserStats.publication_count,
+            UserStats.votes_received,
+            UserStats.rating,
+            UserStats.last_publication_id,
+            UserStats.last_published_at,
+        )
+        .outerjoin(UserStats, UserStats.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = stats.first()
+    if row is not None and settings.USER_STATS_CACHE_SECONDS > 0:
+        _stats_cache.pop(user_id, None)
+        expires_at = time.monotonic() + settings.USER_STATS_CACHE_SECONDS
+        _stats_cache[user_id] = (expires_at, row)
+        while len(_stats_cache) > settings.USER_STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+    return row
+
+
+def mark_stats_stale(session: Session, publication_id: int) -> None:
+    """Have the next refresh recompute the stats of the publication's creator."""
+    session.execute(
+        insert(StaleUserStats)
+        .from_select(
+            ["user_id"],
+            select(Publication.creator_id).where(Publication.id == publication_id),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def mark_user_stats_stale(session: Session, user_id: int) -> None:
+    """Have the next refresh recompute the stats of ``user_id``."""
+    session.execute(
+        insert(StaleUserStats).values(user_id=user_id).on_conflict_do_nothing()
+    )
+
+
+def refresh_user_stats(session: Session, full: bool = False) -> dict:
+    """Recompute stats rows of creators marked stale and commit.
+
+    Everything is rebuilt when ``full`` is set or the table is empty. The
+    totals are summed from the vote counters stored on publications, one
+    index scan over a creator's publications whatever the number of votes.
+    Readers keep seeing the previous rows until the commit.
+    """
+    if not session.scalar(select(func.pg_try_advisory_xact_lock(STATS_REFRESH_LOCK))):
+        return {"skipped": True}
+
+    full = full or session.scalar(select(UserStats.user_id).limit(1)) is None
+    ids = session.scalars(
+        delete(StaleUserStats).returning(StaleUserStats.user_id)
+    ).all()
+    if not full and not ids:
+        session.commit()
+        return {"skipped": False, "full": False, "refreshed": 0}
+
+    last_publication_id = array_agg(
+        aggregate_order_by(
+            Publication.id, Publication.created_at.desc(), Publication.id.desc()
+        )
+    )[1]
+    source = select(
+        Publication.creator_id,
+        func.count(),
+        func.sum(Publication.upvotes + Publication.downvotes),
+        func.sum(Publication.upvotes - Publication.downvotes),
+        last_publication_id,
+        func.max(Publication.created_at),
+    ).where(Publication.deleted_at.is_(None)).group_by(Publication.creator_id)
+    outdated = delete(UserStats)
+    if not full:
+        user_ids = bindparam("user_ids", ids, type_=ARRAY(Integer))
+        source = source.where(Publication.creator_id == any_(user_ids))
+        outdated = outdated.where(UserStats.user_id == any_(user_ids))
+    # creators left without publications simply get no new row
+    session.execute(outdated)
+    inserted = insert(UserStats).from_select(
+        [
+            "user_id",
+            "publication_count",
+            "votes_received",
+            "rating",
+            "last_publication_id",
+            "last_published_at",
+        ],
+        source,
+    ).returning(UserStats.user_id).cte("inserted")
+    refreshed = session.scalar(select(func.count()).select_from(inserted))
+    session.commit()
+    return {"skipped": False, "full": full, "refreshed": refreshed}
@@ -0,0 +1,62 @@
+import logging
+import time
+from datetime import timedelta
+
+from celery import shared_task
+
+from src.config import settings
+from src.database.engine import sync_session
+from src.outbox.service import register_handler
+from src.publications.constants import (
+    PUBLICATION_CREATED,
+    PUBLICATION_DELETED,
+    VOTE_CREATED,
+    VOTE_UPDATED,
+    VOTE_REMOVED,
+)
+from src.users.service import (
+    mark_stats_stale,
+    mark_user_stats_stale,
+    refresh_user_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@register_handler(PUBLICATION_CREATED, VOTE_CREATED, VOTE_UPDATED, VOTE_REMOVED)
+def mark_creator_stats_stale(session, event) -> None:
+    mark_stats_stale(session, event.payload["publication_id"])
+
+
+@register_handler(PUBLICATION_DELETED)
+def mark_former_creator_stats_stale(session, event) -> None:
+    # the publication row may already be purged, the payload names the creator
+    mark_user_stats_stale(session, event.payload["creator_id"])
+
+
+@shared_task
+def refresh_stats(full: bool = False) -> dict:
+    started = time.perf_counter()
+    with sync_session() as session:
+        result = refresh_user_stats(session, full=full)
+    result["duration"] = time.perf_counter() - started
+    if result.get("refreshed"):
+        logger.info(
+            "user_stats refreshed: %(refreshed)s rows in %(duration).3fs, "
+            "full=%(full)s",
+            result,
+        )
+    return result
+
+
+task_settings = {
+    'refresh-user-stats': {
+        'task': 'src.users.tasks.refresh_stats',
+        'schedule': timedelta(seconds=settings.USER_STATS_REFRESH_SECONDS),
+    },
+    'rebuild-user-stats-every-day': {
+        'task': 'src.users.tasks.refresh_stats',
+        'schedule': timedelta(days=1),
+        'kwargs': {'full': True},
+    },
+}
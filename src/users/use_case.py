@@ -1,8 +1,25 @@
+from fastapi import Response
+
 from src.auth.service import CurrentUser
 from src.common.use_case import BaseAsyncUseCase, BaseUseCase
+from src.config import settings
+from src.publications import service as publications_service
+from src.publications.schemas import (
+    PublicationSummary,
+    UserVoteListResponse,
+    UserVotePage,
+    UserVoteQueryParams,
+    UserVoteRead,
+)
 from src.users import service
-from src.users.exceptions import UsernameTaken
-from src.users.schemas import UserCreate, UserResponse
+from src.users.exceptions import UserNotFound, UsernameTaken
+from src.users.schemas import (
+    LastPublication,
+    UserCreate,
+    UserResponse,
+    UserStatsRead,
+    UserStatsResponse,
+)
 
 
 class CreateUser(BaseAsyncUseCase):
@@ -21,3 +38,57 @@ class GetCurrentUser(BaseUseCase):
 
     def __call__(self, *args, **kwargs) -> UserResponse:
         return UserResponse(msg="Current user successfully obtained.", details=self.user)
+
+
+class GetUserVotes(BaseAsyncUseCase):
+    async def __call__(
+            self, user_id: int, params: UserVoteQueryParams
+    ) -> UserVoteListResponse:
+        votes = await publications_service.get_user_votes(
+            self.session, user_id, params.before, params.limit
+        )
+        items = [
+            UserVoteRead(
+                id=vote.id,
+                grade=vote.grade,
+                publication=PublicationSummary(
+                    id=vote.publication_id,
+                    content=vote.content,
+                    truncated=vote.truncated,
+                    created_at=vote.created_at,
+                    rating=vote.rating,
+                    vote_count=vote.vote_count,
+                    creator_id=vote.creator_id,
+                ),
+            )
+            for vote in votes
+        ]
+        next_before = items[-1].id if len(items) == params.limit else None
+        return UserVoteListResponse(
+            msg="Votes successfully received.",
+            details=UserVotePage(items=items, next_before=next_before),
+        )
+
+
+class GetUserStats(BaseAsyncUseCase):
+    async def __call__(self, user_id: int, response: Response) -> UserStatsResponse:
+        stats = await service.get_user_stats(self.session, user_id)
+        if stats is None:
+            raise UserNotFound()
+        details = UserStatsRead(user_id=stats.id)
+        if stats.publication_count is not None:
+            details = UserStatsRead(
+                user_id=stats.id,
+                publication_count=stats.publication_count,
+                votes_received=stats.votes_received,
+                rating=stats.rating,
+                last_publication=LastPublication(
+                    id=stats.last_publication_id, created_at=stats.last_published_at
+                ),
+            )
+        response.headers["Cache-Control"] = (
+            f"public, max-age={int(settings.USER_STATS_CACHE_SECONDS)}"
+        )
+        return UserStatsResponse(
+            msg="User stats successfully received.", details=details
+        )
@@ -1,7 +1,12 @@
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import status
 
+from src.auth.jwt import AccessToken
+from src.common import idempotency
+from src.config import settings
 from src.users.exceptions import UsernameTaken
 from tests.factories import UserFactory
 
@@ -130,3 +135,36 @@ async def test_user_logout(client) -> None:
     )
 
     assert resp.status_code == status.HTTP_200_OK
+
+
+def test_user_login_idempotency_key(client, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "IDEMPOTENCY_STORE", "memory")
+    idempotency.memory_store.clear()
+    users = UserFactory.create_batch(size=2)
+    for user in users:
+        user.set_password("123Aa!")
+    UserFactory.get_current_session().commit()
+
+    def login(user, password="123Aa!"):
+        return client.post(
+            "/auth/token",
+            json={"username": user.username, "password": password},
+            headers={"Idempotency-Key": "login-1"},
+        )
+
+    first = login(users[0])
+    assert first.status_code == status.HTTP_200_OK
+    replay = login(users[0])
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+    assert login(users[0], "other").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # anonymous callers are told apart by username, not by the key alone
+    other = login(users[1])
+    assert other.status_code == status.HTTP_200_OK
+    assert "Idempotent-Replayed" not in other.headers
+
+    # stored token pairs expire with their access token
+    lifetime = AccessToken.lifetime.total_seconds()
+    entries = idempotency.memory_store._entries.values()
+    assert all(entry.expires_at <= time.monotonic() + lifetime for entry in entries)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.common.exceptions import IdempotencyKeyInUse, IdempotencyKeyReused
+from src.common.idempotency import MemoryStore
+from src.config import settings
+
+
+@pytest.mark.asyncio
+async def test_memory_store_holds_duplicates(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 1.0)
+    store = MemoryStore()
+    response = {"status_code": 201, "headers": [], "body": ""}
+
+    assert await store.begin("key", "body", 60) is None
+    duplicate = asyncio.create_task(store.begin("key", "body", 60))
+    await asyncio.sleep(0.01)
+    assert not duplicate.done()
+    with pytest.raises(IdempotencyKeyReused):
+        await store.begin("key", "other body", 60)
+    await store.complete("key", "body", response, 60)
+    assert await duplicate == response
+    assert await store.begin("key", "body", 60) == response
+
+
+@pytest.mark.asyncio
+async def test_memory_store_releases_failed_requests(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 0.05)
+    store = MemoryStore()
+
+    assert await store.begin("key", "body", 60) is None
+    with pytest.raises(IdempotencyKeyInUse):
+        await store.begin("key", "body", 60)
+    duplicate = asyncio.create_task(store.begin("key", "body", 60))
+    await asyncio.sleep(0.01)
+    await store.abort("key")
+    # the duplicate runs the request itself now
+    assert await duplicate is None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_entries():
+    store = MemoryStore()
+    response = {"status_code": 201, "headers": [], "body": ""}
+
+    assert await store.begin("long", "body", 60) is None
+    await store.complete("long", "body", response, 60)
+    assert await store.begin("short", "body", 0) is None
+    # an expired key is free again, whatever the request
+    assert await store.begin("short", "other body", 60) is None
+    assert await store.begin("long", "body", 60) == response
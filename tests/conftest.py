@@ -12,6 +12,8 @@ from testcontainers.postgres import PostgresContainer
 from alembic.config import Config as AlembicConfig
 from src.config import Config
 from src.database.dependency import get_async_session
+from src.publications import service as publications_service
+from src.users import service as users_service
 from tests.factories.base import BaseFactory
 
 
@@ -86,6 +88,14 @@ def set_factory_session(db_sync_session: Session) -> None:
     BaseFactory.set_session(db_sync_session)
 
 
+@pytest.fixture(autouse=True)
+def clear_worker_caches() -> None:
+    # user and publication ids are reused by every test's fresh database
+    users_service._usernames.clear()
+    users_service._stats_cache.clear()
+    publications_service._trending_cache.clear()
+
+
 @pytest.fixture(scope="session")
 def client(settings) -> TestClient:
     from src.main import app
@@ -1,8 +1,9 @@
 import random
 
 import factory
+from sqlalchemy import update
 
-from src.publications.models import Vote
+from src.publications.models import Publication, Vote
 from tests.factories.base import BaseFactory
 
 
@@ -24,4 +25,17 @@ class VoteFactory(BaseFactory):
             creator = PublicationFactory()
             kwargs["publication_id"] = creator.id
 
-        return super()._create(model_class, *args, **kwargs)
+        vote = super()._create(model_class, *args, **kwargs)
+
+        # keep the totals maintained by the vote use cases consistent
+        session = cls._meta.sqlalchemy_session
+        session.execute(
+            update(Publication)
+            .where(Publication.id == vote.publication_id)
+            .values(
+                upvotes=Publication.upvotes + int(vote.grade),
+                downvotes=Publication.downvotes + int(not vote.grade),
+            )
+        )
+        session.commit()
+        return vote
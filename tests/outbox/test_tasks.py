@@ -0,0 +1,102 @@
+import datetime
+
+from fastapi import status
+from sqlalchemy import select, update
+
+from src.outbox import service
+from src.outbox.models import OutboxEvent
+from src.publications.constants import PUBLICATION_CREATED, VOTE_CREATED, VOTE_REMOVED
+from tests.factories import UserFactory
+
+
+def _create_publication(client, credentials) -> int:
+    resp = client.post(
+        "/publications",
+        json={"content": "test"},
+        headers={"Authorization": credentials},
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+    return resp.json()["details"]["id"]
+
+
+def test_events_are_handled_in_order(client, db_sync_session, monkeypatch):
+    handled = []
+
+    def handler(session, event):
+        handled.append(event.id)
+
+    monkeypatch.setitem(service._handlers, VOTE_CREATED, [handler])
+    monkeypatch.setitem(service._handlers, VOTE_REMOVED, [handler])
+    credentials = UserFactory.get_credentials(UserFactory())
+    publication_id = _create_publication(client, credentials)
+    for method in ("post", "delete", "post"):
+        resp = client.request(
+            method, f"/publications/{publication_id}/vote",
+            json={"grade": True} if method == "post" else None,
+            headers={"Authorization": credentials},
+        )
+        assert resp.is_success
+
+    events = db_sync_session.scalars(select(OutboxEvent).order_by(OutboxEvent.id)).all()
+    assert [event.event_type for event in events] == [
+        PUBLICATION_CREATED, VOTE_CREATED, VOTE_REMOVED, VOTE_CREATED
+    ]
+    assert events[1].payload == {
+        "publication_id": publication_id,
+        "user_id": events[0].payload["creator_id"],
+        "grade": True,
+    }
+
+    result = service.process_events(db_sync_session, batch_size=10)
+    assert result == {"claimed": 4, "processed": 4, "failed": 0, "deferred": 0}
+    assert handled == [event.id for event in events[1:]]
+    assert service.process_events(db_sync_session, batch_size=10)["claimed"] == 0
+
+
+def test_failed_event_holds_back_its_aggregate(client, db_sync_session, monkeypatch):
+    def handler(session, event):
+        if event.aggregate_id == failing_id:
+            raise RuntimeError("boom")
+
+    monkeypatch.setitem(service._handlers, PUBLICATION_CREATED, [handler])
+    monkeypatch.setitem(service._handlers, VOTE_CREATED, [handler])
+    credentials = UserFactory.get_credentials(UserFactory())
+    failing_id = _create_publication(client, credentials)
+    _create_publication(client, credentials)
+    client.post(
+        f"/publications/{failing_id}/vote",
+        json={"grade": False},
+        headers={"Authorization": credentials},
+    )
+
+    result = service.process_events(db_sync_session, batch_size=10)
+    assert result == {"claimed": 3, "processed": 1, "failed": 1, "deferred": 1}
+
+    pending = db_sync_session.execute(
+        select(OutboxEvent.aggregate_id, OutboxEvent.attempts, OutboxEvent.last_error)
+        .where(OutboxEvent.processed_at.is_(None))
+        .order_by(OutboxEvent.id)
+    ).all()
+    assert pending == [
+        (failing_id, 1, "RuntimeError('boom')"), (failing_id, 0, None)
+    ]
+
+
+def test_compact_events(client, db_sync_session):
+    credentials = UserFactory.get_credentials(UserFactory())
+    _create_publication(client, credentials)
+    _create_publication(client, credentials)
+    service.process_events(db_sync_session, batch_size=10)
+
+    first_id, second_id = db_sync_session.scalars(
+        select(OutboxEvent.id).order_by(OutboxEvent.id)
+    ).all()
+    db_sync_session.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == first_id)
+        .values(processed_at=datetime.datetime(2000, 1, 1))
+    )
+    db_sync_session.commit()
+
+    assert service.compact_events(db_sync_session) == 1
+    assert db_sync_session.scalars(select(OutboxEvent.id)).all() == [second_id]
@@ -1,12 +1,38 @@
+import asyncio
 import datetime
+import json
+from types import SimpleNamespace
 
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import status
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import undefer
 
-from src.publications.models import Publication, Vote
+from src.common import idempotency
+from src.config import settings
+from src.database.dependency import get_async_session
+from src.publications.models import (
+    Publication,
+    PublicationScore,
+    PublicationVoteBucket,
+    PublicationVoteShard,
+    StalePublicationScore,
+    Vote,
+)
+from src.publications import live, service, use_case, warmup
+from src.publications.exceptions import VoteDoesNotExist
+from src.publications.schemas import VoteBase
+from src.publications.service import (
+    compact_vote_buckets,
+    compact_vote_shards,
+    get_publications_stmt,
+    purge_publication,
+    refresh_publication_scores,
+)
+from src.users import service as users_service
 from src.users.models import User
 from tests.factories import UserFactory
 from tests.factories.publication import PublicationFactory
@@ -32,7 +58,9 @@ async def test_create_publication_auth(client: TestClient, db_session: AsyncSess
     details = resp.json()["details"]
 
     pub_in_db = await db_session.scalar(
-        select(Publication).where(Publication.id == details["id"])
+        select(Publication)
+        .options(undefer(Publication.content))
+        .where(Publication.id == details["id"])
     )
     assert pub_in_db.content == details["content"]
 
@@ -47,6 +75,46 @@ async def test_create_vote_no_auth(client: TestClient) -> None:
     assert resp.status_code == status.HTTP_403_FORBIDDEN
 
 
+def test_create_publication_idempotency_key(client, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_STORE", "memory")
+    idempotency.memory_store.clear()
+    credentials = UserFactory.get_credentials(UserFactory())
+
+    def post(content: str, key: str | None = "retry-1"):
+        headers = {"Authorization": credentials}
+        if key is not None:
+            headers["Idempotency-Key"] = key
+        return client.post("/publications", json={"content": content}, headers=headers)
+
+    first = post("test")
+    assert first.status_code == status.HTTP_201_CREATED
+    assert "Idempotent-Replayed" not in first.headers
+
+    def no_database():
+        raise AssertionError("a replay must not touch the database")
+
+    with monkeypatch.context() as m:
+        m.setitem(client.app.dependency_overrides, get_async_session, no_database)
+        replay = post("test")
+    assert replay.status_code == status.HTTP_201_CREATED
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+
+    assert post("other").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert post("test", key="x" * 256).status_code == status.HTTP_400_BAD_REQUEST
+    unkeyed = post("test", key=None)
+    assert unkeyed.json()["details"]["id"] != first.json()["details"]["id"]
+
+    vote = {"Authorization": credentials, "Idempotency-Key": "vote-1"}
+    for _ in range(2):
+        resp = client.post(
+            f"/publications/{first.json()['details']['id']}/vote",
+            json={"grade": True}, headers=vote,
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+    assert resp.headers["Idempotent-Replayed"] == "true"
+
+
 @pytest.mark.asyncio
 async def test_create_vote_auth(client: TestClient, db_session) -> None:
     publication = PublicationFactory()
@@ -128,6 +196,46 @@ async def test_remove_vote_auth(client: TestClient, db_session) -> None:
     assert resp.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.asyncio
+async def test_concurrent_vote_changes(settings, db_sync_session) -> None:
+    vote = VoteFactory(grade=False)
+    vote_id, user_id, publication_id = vote.id, vote.user_id, vote.publication_id
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    make_session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def call(use_case, *args):
+        async with make_session() as session:
+            try:
+                return await use_case(session)(user_id, publication_id, *args)
+            except VoteDoesNotExist as exc:
+                return exc
+
+    def totals():
+        db_sync_session.expire_all()
+        publication = db_sync_session.get(Publication, publication_id)
+        return publication.upvotes, publication.downvotes
+
+    async def race(use_case, *args):
+        # both requests queue behind this row lock and see the same vote
+        db_sync_session.execute(
+            select(Vote).where(Vote.id == vote_id).with_for_update()
+        )
+        calls = [asyncio.create_task(call(use_case, *args)) for _ in range(2)]
+        await asyncio.sleep(0.2)
+        db_sync_session.commit()
+        return await asyncio.gather(*calls)
+
+    try:
+        await race(use_case.UpdateUserVoteForPublication, VoteBase(grade=True))
+        assert totals() == (1, 0)
+
+        results = await race(use_case.RemoveUserVoteForPublication)
+        assert sum(isinstance(result, VoteDoesNotExist) for result in results) == 1
+        assert totals() == (0, 0)
+    finally:
+        await engine.dispose()
+
+
 def test_remove_vote_no_auth(client: TestClient) -> None:
     publication = PublicationFactory()
     resp = client.delete(f"/publications/{publication.id}/vote")
@@ -266,3 +374,828 @@ def test_get_publications_ordering_by_creation_date_desc(client):
     for i in range(2):
         if publications_data[i]["id"] != true_order[i].id:
             assert False
+
+
+def test_get_publications_from_snapshot(client, db_sync_session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLICATION_SNAPSHOT", True)
+    publication = PublicationFactory()
+    VoteFactory.create_batch(publication_id=publication.id, grade=True, size=3)
+    VoteFactory.create_batch(publication_id=publication.id, grade=False, size=1)
+
+    result = refresh_publication_scores(db_sync_session)
+    assert result["full"] is True
+
+    resp = client.get("/publications")
+    assert resp.status_code == status.HTTP_200_OK
+    publication_data = resp.json()["details"][0]
+    assert publication_data["rating"] == 2
+    assert publication_data["vote_count"] == 4
+    assert publication_data["creator"]["id"] == publication.creator_id
+
+
+def test_snapshot_refresh_only_stale_publications(client, db_sync_session, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLICATION_SNAPSHOT", True)
+    publication = PublicationFactory()
+    PublicationFactory()
+    refresh_publication_scores(db_sync_session)
+
+    user = UserFactory()
+    resp = client.post(
+        f"/publications/{publication.id}/vote",
+        json={"grade": False},
+        headers={"Authorization": UserFactory.get_credentials(user)}
+    )
+    assert resp.status_code == status.HTTP_201_CREATED
+
+    result = refresh_publication_scores(db_sync_session)
+    assert result["full"] is False
+    assert result["refreshed"] == 1
+
+    resp = client.get("/publications", params={"order_by": "rating"})
+    publication_data = resp.json()["details"][0]
+    assert publication_data["id"] == publication.id
+    assert publication_data["rating"] == -1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_waits_for_marking_vote(
+        settings, db_sync_session, monkeypatch
+):
+    monkeypatch.setattr(service.settings, "PUBLICATION_SNAPSHOT", True)
+    publication = PublicationFactory()
+    voter = UserFactory()
+    refresh_publication_scores(db_sync_session)
+    db_sync_session.add(StalePublicationScore(publication_id=publication.id))
+    db_sync_session.commit()
+
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    try:
+        async with async_sessionmaker(bind=engine)() as session:
+            await service.create_vote(session, voter.id, publication.id, grade=True)
+            await service.mark_score_stale(session, publication.id)
+            # the marker was already there, the refresh must still wait for the vote
+            refresh = asyncio.create_task(
+                asyncio.to_thread(refresh_publication_scores, db_sync_session)
+            )
+            await asyncio.sleep(0.2)
+            assert not refresh.done()
+            await session.commit()
+        assert (await refresh)["refreshed"] == 1
+    finally:
+        await engine.dispose()
+    score = db_sync_session.get(PublicationScore, publication.id)
+    assert (score.rating, score.vote_count) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_get_publications_ordering_by_hot(client, db_session):
+    date = datetime.datetime.now()
+    old = PublicationFactory.create(created_at=date - datetime.timedelta(days=2))
+    fresh = PublicationFactory.create(created_at=date)
+    fresh_voted = PublicationFactory.create(created_at=date)
+
+    voters = UserFactory.create_batch(size=3)
+    for publication, grades in (
+            (old, (True, True, True)), (fresh_voted, (True, True, False))
+    ):
+        for user, grade in zip(voters, grades):
+            resp = client.post(
+                f"/publications/{publication.id}/vote",
+                json={"grade": grade},
+                headers={"Authorization": UserFactory.get_credentials(user)}
+            )
+            assert resp.status_code == status.HTTP_201_CREATED
+    resp = client.put(
+        f"/publications/{fresh_voted.id}/vote",
+        json={"grade": True},
+        headers={"Authorization": UserFactory.get_credentials(voters[2])}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    resp = client.delete(
+        f"/publications/{old.id}/vote",
+        headers={"Authorization": UserFactory.get_credentials(voters[0])}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    totals = (await db_session.execute(
+        select(Publication.id, Publication.upvotes, Publication.downvotes)
+    )).all()
+    assert sorted(totals) == [(old.id, 2, 0), (fresh.id, 0, 0), (fresh_voted.id, 3, 0)]
+
+    resp = client.get("/publications", params={"order_by": "hot", "desc": True})
+    assert resp.status_code == status.HTTP_200_OK
+    ids = [item["id"] for item in resp.json()["details"]]
+    assert ids == [fresh_voted.id, fresh.id, old.id]
+
+
+def test_get_publications_ordering_by_best(client):
+    unvoted = PublicationFactory()
+    single = PublicationFactory()
+    popular = PublicationFactory()
+
+    voters = UserFactory.create_batch(size=10)
+    votes = [(single, voters[0], True)] + [
+        (popular, user, i > 0) for i, user in enumerate(voters)
+    ]
+    for publication, user, grade in votes:
+        resp = client.post(
+            f"/publications/{publication.id}/vote",
+            json={"grade": grade},
+            headers={"Authorization": UserFactory.get_credentials(user)}
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+
+    resp = client.get("/publications", params={"order_by": "best", "desc": True})
+    assert resp.status_code == status.HTTP_200_OK
+    ids = [item["id"] for item in resp.json()["details"]]
+    assert ids == [popular.id, single.id, unvoted.id]
+
+
+def test_get_publications_ordering_by_trending(client, db_sync_session, monkeypatch):
+    monkeypatch.setattr(settings, "TRENDING_CACHE_SECONDS", 0)
+    popular, rising, quiet, retracted = PublicationFactory.create_batch(size=4)
+    now = db_sync_session.scalar(select(func.localtimestamp()))
+    db_sync_session.add(PublicationVoteBucket(
+        publication_id=quiet.id, bucket_start=now - datetime.timedelta(days=3), votes=5
+    ))
+    db_sync_session.commit()
+
+    voters = UserFactory.create_batch(size=2)
+    for publication, users in (
+            (popular, voters), (rising, voters[:1]), (retracted, voters[:1])
+    ):
+        for user in users:
+            resp = client.post(
+                f"/publications/{publication.id}/vote",
+                json={"grade": True},
+                headers={"Authorization": UserFactory.get_credentials(user)}
+            )
+            assert resp.status_code == status.HTTP_201_CREATED
+    resp = client.delete(
+        f"/publications/{retracted.id}/vote",
+        headers={"Authorization": UserFactory.get_credentials(voters[0])}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    resp = client.get("/publications", params={"order_by": "trending", "desc": True})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in resp.json()["details"]] == [popular.id, rising.id]
+
+    resp = client.get(
+        "/publications", params={"order_by": "trending", "desc": True, "window": "7d"}
+    )
+    assert [item["id"] for item in resp.json()["details"]] == [
+        quiet.id, popular.id, rising.id
+    ]
+
+    monkeypatch.setattr(settings, "TRENDING_CACHE_SECONDS", 60)
+    monkeypatch.setattr(settings, "TRENDING_CACHE_SIZE", 1)
+    for window in ("24h", "7d"):
+        client.get("/publications", params={"order_by": "trending", "window": window})
+    assert [key[0] for key in service._trending_cache] == ["7d"]
+
+
+def test_compact_vote_buckets(db_sync_session):
+    publication = PublicationFactory()
+    now = db_sync_session.scalar(select(func.localtimestamp()))
+    day = (now - datetime.timedelta(days=3)).replace(
+        hour=10, minute=0, second=0, microsecond=0
+    )
+    recent = now.replace(minute=0, second=0, microsecond=0)
+    for bucket_start, votes in (
+            (day, 2),
+            (day + datetime.timedelta(hours=1), 3),
+            (now - datetime.timedelta(days=10), 7),
+            (recent, 1),
+    ):
+        db_sync_session.add(PublicationVoteBucket(
+            publication_id=publication.id, bucket_start=bucket_start, votes=votes
+        ))
+    db_sync_session.commit()
+
+    result = compact_vote_buckets(db_sync_session)
+    assert result == {"expired": 1, "compacted": 1}
+
+    buckets = db_sync_session.execute(
+        select(PublicationVoteBucket.bucket_start, PublicationVoteBucket.votes)
+        .order_by(PublicationVoteBucket.bucket_start)
+    ).all()
+    assert buckets == [(day.replace(hour=0), 5), (recent, 1)]
+
+
+@pytest.mark.asyncio
+async def test_readiness_after_warmup(client, settings, migrations, monkeypatch):
+    monkeypatch.setattr(warmup, "state", warmup.WarmupState())
+    resp = client.get("/readiness")
+    assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    PublicationFactory()
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    try:
+        assert await warmup.warm_up(async_sessionmaker(bind=engine))
+    finally:
+        await engine.dispose()
+
+    resp = client.get("/readiness")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["listings"] == len(settings.WARMUP_LISTINGS)
+    assert resp.json()["connections"] == engine.pool.size()
+
+
+def test_get_publications_with_my_vote(client):
+    user = UserFactory()
+    credentials = UserFactory.get_credentials(user)
+    upvoted, downvoted, unvoted = PublicationFactory.create_batch(size=3)
+    VoteFactory(publication_id=upvoted.id, user_id=user.id, grade=True)
+    VoteFactory(publication_id=downvoted.id, user_id=user.id, grade=False)
+    VoteFactory(publication_id=unvoted.id, grade=True)
+
+    resp = client.get("/publications", headers={"Authorization": credentials})
+    assert resp.status_code == status.HTTP_200_OK
+    my_votes = {item["id"]: item["my_vote"] for item in resp.json()["details"]}
+    assert my_votes == {upvoted.id: True, downvoted.id: False, unvoted.id: None}
+
+    resp = client.get("/publications")
+    assert resp.status_code == status.HTTP_200_OK
+    assert all("my_vote" not in item for item in resp.json()["details"])
+
+    resp = client.get("/publications", headers={"Authorization": "Bearer invalid"})
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_get_publication_conditional(client):
+    # totals only: factory vote ids would collide with the vote posted below
+    publication = PublicationFactory(upvotes=2)
+
+    resp = client.get(f"/publications/{publication.id}")
+    assert resp.status_code == status.HTTP_200_OK
+    details = resp.json()["details"]
+    assert details["id"] == publication.id
+    assert details["rating"] == 2
+    assert details["vote_count"] == 2
+    etag = resp.headers["ETag"]
+
+    resp = client.get(
+        f"/publications/{publication.id}", headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp.headers["ETag"] == etag
+    assert resp.content == b""
+
+    user = UserFactory()
+    client.post(
+        f"/publications/{publication.id}/vote",
+        json={"grade": False},
+        headers={"Authorization": UserFactory.get_credentials(user)}
+    )
+    resp = client.get(
+        f"/publications/{publication.id}", headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["ETag"] != etag
+    assert resp.json()["details"]["vote_count"] == 3
+
+
+def test_get_publication_not_found(client):
+    resp = client.get("/publications/12345")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+    resp = client.get("/publications/12345", headers={"If-None-Match": '"x"'})
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_publication(client, db_sync_session, monkeypatch):
+    purges = []
+    monkeypatch.setattr(
+        use_case, "schedule_purge", lambda **kw: purges.append(kw) or "task"
+    )
+    author, other = UserFactory(), UserFactory()
+    publication, kept = PublicationFactory.create_batch(size=2, creator_id=author.id)
+    VoteFactory.create_batch(publication_id=publication.id, size=3)
+    url = f"/publications/{publication.id}"
+    as_author = {"Authorization": UserFactory.get_credentials(author)}
+
+    as_other = {"Authorization": UserFactory.get_credentials(other)}
+    resp = client.delete(url, headers=as_other)
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+    resp = client.delete(url, headers=as_author)
+    assert resp.status_code == status.HTTP_202_ACCEPTED
+    assert resp.json()["details"] == {"deleted": 1, "task_id": "task"}
+    assert purges == [{"publication_id": publication.id}]
+    # hidden right away, the votes are still there
+    assert client.get(url).status_code == status.HTTP_404_NOT_FOUND
+    listed = client.get("/publications").json()["details"]
+    assert [item["id"] for item in listed] == [kept.id]
+    resp = client.delete(url, headers=as_author)
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(service, "PURGE_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "PUBLICATION_PURGE_PAUSE_SECONDS", 0)
+    progress = []
+    purged = purge_publication(
+        db_sync_session, publication.id, on_batch=progress.append
+    )
+    assert purged == 3
+    assert progress == [2, 3]
+    assert db_sync_session.get(Publication, publication.id) is None
+    assert db_sync_session.scalar(select(func.count()).select_from(Vote)) == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_publication_waits_for_late_vote(settings, db_sync_session):
+    publication = PublicationFactory()
+    publication_id = publication.id
+    voter = UserFactory()
+
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    try:
+        async with async_sessionmaker(bind=engine)() as session:
+            await service.create_vote(session, voter.id, publication_id, grade=True)
+            await session.flush()
+            purge = asyncio.create_task(
+                asyncio.to_thread(purge_publication, db_sync_session, publication_id)
+            )
+            await asyncio.sleep(0.2)
+            assert not purge.done()
+            await session.commit()
+        assert await purge == 1
+    finally:
+        await engine.dispose()
+    assert db_sync_session.get(Publication, publication_id) is None
+
+
+def test_sharded_vote_totals(client, db_sync_session, monkeypatch):
+    monkeypatch.setattr(settings, "VOTE_COUNTER_SHARDS", 4)
+    publication = PublicationFactory()
+    voters = UserFactory.create_batch(size=5)
+    version = client.get("/publications").headers["ETag"]
+    for i, voter in enumerate(voters):
+        resp = client.post(
+            f"/publications/{publication.id}/vote",
+            json={"grade": i != 0},
+            headers={"Authorization": UserFactory.get_credentials(voter)},
+        )
+        assert resp.status_code == status.HTTP_201_CREATED
+    resp = client.delete(
+        f"/publications/{publication.id}/vote",
+        headers={"Authorization": UserFactory.get_credentials(voters[1])},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    # the publication row is not written by votes, reads add the shards
+    stored = db_sync_session.get(Publication, publication.id)
+    assert (stored.upvotes, stored.downvotes) == (0, 0)
+    assert 0 < db_sync_session.scalar(
+        select(func.count()).select_from(PublicationVoteShard)
+    ) <= 4
+    details = client.get(f"/publications/{publication.id}").json()["details"]
+    assert (details["rating"], details["vote_count"]) == (2, 4)
+    assert client.get("/publications").headers["ETag"] == version
+    PublicationFactory(creator_id=publication.creator_id, upvotes=1)
+    resp = client.get(
+        "/publications",
+        params={
+            "creator_id": publication.creator_id, "order_by": "rating", "desc": True,
+            "limit": 1,
+        },
+    )
+    assert [item["id"] for item in resp.json()["details"]] == [publication.id]
+    resp = client.get(
+        "/users/me/votes",
+        headers={"Authorization": UserFactory.get_credentials(voters[0])},
+    )
+    voted = resp.json()["details"]["items"][0]["publication"]
+    assert (voted["rating"], voted["vote_count"]) == (2, 4)
+    exported = json.loads(client.get("/publications/export").text.splitlines()[0])
+    assert (exported["rating"], exported["vote_count"]) == (2, 4)
+
+    assert compact_vote_shards(db_sync_session)["publications"] == 1
+    db_sync_session.refresh(stored)
+    assert (stored.upvotes, stored.downvotes) == (3, 1)
+    assert stored.best_score > 0
+    shards = select(func.count()).select_from(PublicationVoteShard)
+    assert db_sync_session.scalar(shards) == 0
+    assert db_sync_session.scalar(
+        select(PublicationVoteBucket.votes)
+        .where(PublicationVoteBucket.publication_id == publication.id)
+    ) == 4
+    details = client.get(f"/publications/{publication.id}").json()["details"]
+    assert (details["rating"], details["vote_count"]) == (2, 4)
+    assert client.get("/publications").headers["ETag"] != version
+
+
+@pytest.mark.asyncio
+async def test_live_hub_coalesces_updates(settings):
+    first, second, third = PublicationFactory.create_batch(size=3)
+    VoteFactory.create_batch(publication_id=first.id, grade=True, size=3)
+    VoteFactory(publication_id=first.id, grade=False)
+    VoteFactory(publication_id=second.id, grade=False)
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    hub = live.LiveHub(async_sessionmaker(bind=engine))
+    watcher = live.Subscriber(frozenset({first.id, second.id}))
+    other = live.Subscriber(frozenset({third.id}))
+    for subscriber in (watcher, other):
+        for publication_id in subscriber.ids:
+            hub.subscribers[publication_id].add(subscriber)
+
+    try:
+        for publication_id in (first.id, first.id, second.id, third.id + 1, first.id):
+            hub.receive(str(publication_id).encode())
+        assert hub.pending == {first.id, second.id}  # nobody watches the other one
+        await hub.flush()
+    finally:
+        await engine.dispose()
+    assert watcher.updates == {
+        first.id: {"id": first.id, "rating": 2, "vote_count": 4},
+        second.id: {"id": second.id, "rating": -1, "vote_count": 1},
+    }
+    assert watcher.ready.is_set() and not other.ready.is_set()
+    assert hub.pending == set()
+
+
+class FakePubSub:
+    """Hands out ``messages`` in order, raising those that are exceptions."""
+
+    def __init__(self, messages: list):
+        self.messages = messages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def subscribe(self, channel: str) -> None:
+        pass
+
+    async def get_message(self, ignore_subscribe_messages: bool, timeout: float):
+        if not self.messages:
+            await asyncio.sleep(timeout)
+            return None
+        message = self.messages.pop(0)
+        if isinstance(message, Exception):
+            raise message
+        return {"type": "message", "data": message}
+
+
+@pytest.mark.asyncio
+async def test_live_hub_survives_bad_messages(settings, monkeypatch):
+    monkeypatch.setattr(live.settings, "LIVE_UPDATE_INTERVAL", 0.01)
+    monkeypatch.setattr(live, "RECONNECT_SECONDS", 0)
+    publication = PublicationFactory(upvotes=1)
+    messages = [b"not-an-id", RuntimeError("boom"), str(publication.id).encode()]
+    redis = SimpleNamespace(pubsub=lambda: FakePubSub(messages))
+    monkeypatch.setattr(live, "get_redis", lambda: redis)
+
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    hub = live.LiveHub(async_sessionmaker(bind=engine))
+    watcher = live.Subscriber(frozenset({publication.id}))
+    hub.add(watcher)
+    try:
+        await asyncio.wait_for(watcher.ready.wait(), timeout=5)
+    finally:
+        hub.remove(watcher)
+        await hub._task
+        await engine.dispose()
+    assert watcher.updates == {
+        publication.id: {"id": publication.id, "rating": 1, "vote_count": 1}
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_publication_counts(settings, monkeypatch):
+    monkeypatch.setattr(live.settings, "LIVE_KEEPALIVE_SECONDS", 0.01)
+    publication = PublicationFactory()
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    hub = live.LiveHub(async_sessionmaker(bind=engine))
+    watcher = live.Subscriber(frozenset({publication.id}))
+    initial = [{"id": publication.id, "rating": 0, "vote_count": 0}]
+    stream = live.stream_counts(watcher, initial, hub=hub)
+    try:
+        assert await anext(stream) == live.sse_event(initial)
+        assert await anext(stream) == ": keep-alive\n\n"
+        VoteFactory(publication_id=publication.id, grade=False)
+        hub.receive(str(publication.id))
+        await hub.flush()
+        update = [{"id": publication.id, "rating": -1, "vote_count": 1}]
+        assert await anext(stream) == live.sse_event(update)
+    finally:
+        await stream.aclose()
+        hub._task.cancel()
+        await engine.dispose()
+    assert not hub.subscribers
+
+
+def test_stream_publication_counts_limits(client, monkeypatch):
+    monkeypatch.setattr(settings, "LIVE_MAX_IDS", 2)
+    resp = client.get("/publications/live", params={"ids": [1, 2, 3]})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    resp = client.get("/publications/live")
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_publications_conditional(client):
+    publication = PublicationFactory()
+
+    resp = client.get("/publications")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Cache-Control"].startswith("public, max-age=")
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+
+    resp = client.get("/publications", headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp.headers["ETag"] == etag
+    resp = client.get("/publications", headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    resp = client.get(
+        "/publications", params={"desc": True}, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+    user = UserFactory()
+    credentials = UserFactory.get_credentials(user)
+    resp = client.get(
+        "/publications", headers={"If-None-Match": etag, "Authorization": credentials}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+
+    client.post(
+        f"/publications/{publication.id}/vote",
+        json={"grade": True},
+        headers={"Authorization": credentials}
+    )
+    resp = client.get("/publications", headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_listing_version_slots(settings, monkeypatch):
+    slots = iter([0, 1])
+    monkeypatch.setattr(service.random, "randrange", lambda n: next(slots))
+
+    engine = create_async_engine(settings.get_db_url(async_=True))
+    sessions = async_sessionmaker(bind=engine)
+    try:
+        async with sessions() as reader, sessions() as first, sessions() as second:
+            before = await service.get_listing_version(reader)
+            await service.bump_listing_version(first)
+            # another slot, so the second writer does not wait for the first
+            await asyncio.wait_for(service.bump_listing_version(second), timeout=5)
+            assert await service.get_listing_version(reader) == before
+
+            await first.commit()
+            await second.commit()
+            after = await service.get_listing_version(reader)
+            assert after.version == before.version + 2
+            assert after.changed_at > before.changed_at
+    finally:
+        await engine.dispose()
+
+
+def test_get_publications_conditional_trending(client, monkeypatch):
+    start = datetime.datetime.now(datetime.timezone.utc)
+    monkeypatch.setattr(service, "trending_period", lambda: (1, start))
+    params = {"order_by": "trending"}
+
+    resp = client.get("/publications", params=params)
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+    resp = client.get("/publications", params=params, headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # nothing was written, but the cached page may have been recomputed
+    later = start + datetime.timedelta(minutes=1)
+    monkeypatch.setattr(service, "trending_period", lambda: (2, later))
+    resp = client.get("/publications", params=params, headers={"If-None-Match": etag})
+    assert resp.status_code == status.HTTP_200_OK
+    resp = client.get(
+        "/publications", params=params, headers={"If-Modified-Since": last_modified}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+
+
+def test_search_publications(client):
+    once = PublicationFactory(content="A walk along the river to the old castle")
+    twice = PublicationFactory(
+        content="Castles of the Loire: every castle worth a detour"
+    )
+    PublicationFactory(content="Street food market tour")
+    VoteFactory.create_batch(publication_id=once.id, grade=True, size=2)
+
+    resp = client.get("/publications", params={"q": "castle"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in resp.json()["details"]] == [twice.id, once.id]
+
+    resp = client.get(
+        "/publications", params={"q": "castle", "order_by": "rating", "desc": True}
+    )
+    assert [item["id"] for item in resp.json()["details"]] == [once.id, twice.id]
+    assert resp.json()["details"][0]["rating"] == 2
+
+    resp = client.get("/publications", params={"q": 'castle -"old castle"', "limit": 1})
+    assert [item["id"] for item in resp.json()["details"]] == [twice.id]
+
+    resp = client.get("/publications", params={"q": "museum"})
+    assert resp.json()["details"] == []
+
+
+def test_filter_publications(client):
+    author, other = UserFactory(), UserFactory()
+    start = datetime.datetime(2024, 3, 1)
+    older, newer, outside = (
+        PublicationFactory(
+            creator_id=author.id, created_at=start + datetime.timedelta(days=days)
+        )
+        for days in (0, 1, 7)
+    )
+    PublicationFactory(creator_id=other.id, created_at=start)
+    VoteFactory(publication_id=older.id, grade=True)
+
+    resp = client.get("/publications", params={"creator_id": author.id})
+    assert resp.status_code == status.HTTP_200_OK
+    assert len(resp.json()["details"]) == 3
+
+    params = {
+        "creator_id": author.id,
+        "created_after": "2024-03-01T00:00:00Z",
+        "created_before": "2024-03-08T00:00:00Z",
+    }
+    resp = client.get(
+        "/publications", params={**params, "order_by": "created_at", "desc": True}
+    )
+    assert [item["id"] for item in resp.json()["details"]] == [newer.id, older.id]
+
+    resp = client.get(
+        "/publications", params={**params, "order_by": "rating", "desc": True}
+    )
+    assert [item["id"] for item in resp.json()["details"]] == [older.id, newer.id]
+    assert outside.id not in {item["id"] for item in resp.json()["details"]}
+
+
+@pytest.mark.parametrize(
+    ("order_by", "filters", "index"),
+    [
+        ("created_at", {"creator_id": 1}, "ix_publications_creator_id_created_at"),
+        ("rating", {"creator_id": 1}, "ix_publications_creator_id_created_at"),
+        (
+            "created_at",
+            {"created_after": datetime.datetime(2024, 1, 1)},
+            "ix_publications_created_at",
+        ),
+        (
+            "rating",
+            {
+                "created_after": datetime.datetime(2024, 1, 1),
+                "created_before": datetime.datetime(2024, 2, 1),
+            },
+            "ix_publications_created_at",
+        ),
+    ]
+)
+def test_filter_publications_plan(db_sync_session, order_by, filters, index):
+    for creator in UserFactory.create_batch(size=20):
+        PublicationFactory.create_batch(size=5, creator_id=creator.id)
+    db_sync_session.execute(text("ANALYZE publications"))
+    # the table is tiny, make the planner show what it would do with a large one
+    db_sync_session.execute(text("SET enable_seqscan = off"))
+
+    stmt = get_publications_stmt(order_by, True, 10, **filters)
+    sql = stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    plan = "\n".join(db_sync_session.execute(text(f"EXPLAIN {sql}")).scalars())
+    assert index in plan
+    assert "Seq Scan on publications" not in plan
+
+
+def test_export_publications(client):
+    publications = PublicationFactory.create_batch(size=3)
+    VoteFactory.create_batch(publication_id=publications[0].id, grade=True, size=2)
+
+    resp = client.get("/publications/export", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Content-Type"] == "application/x-ndjson"
+    assert "Content-Encoding" not in resp.headers
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["id"] for line in lines] == [p.id for p in publications]
+    assert lines[0]["rating"] == 2 and lines[0]["vote_count"] == 2
+
+    resp = client.get(
+        "/publications/export",
+        params={"after_id": publications[0].id},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.headers["Content-Encoding"] == "gzip"
+    # the client decompresses transparently
+    assert [json.loads(line)["id"] for line in resp.text.splitlines()] == [
+        p.id for p in publications[1:]
+    ]
+
+
+def test_get_publications_fields(client):
+    user = UserFactory()
+    credentials = UserFactory.get_credentials(user)
+    publication = PublicationFactory()
+    VoteFactory(publication_id=publication.id, user_id=user.id, grade=True)
+
+    resp = client.get("/publications", params={"fields": "content,rating"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["details"] == [
+        {
+            "id": publication.id,
+            "content": publication.content,
+            "truncated": False,
+            "rating": 1,
+        }
+    ]
+
+    resp = client.get(
+        "/publications",
+        params={"fields": "creator,my_vote", "order_by": "created_at"},
+        headers={"Authorization": credentials},
+    )
+    item, = resp.json()["details"]
+    assert set(item) == {"id", "creator", "my_vote"}
+    assert item["my_vote"] is True
+
+    resp = client.get("/publications", params={"fields": "my_vote"})
+    assert resp.json()["details"] == [{"id": publication.id}]
+
+    resp = client.get("/publications", params={"fields": "content,password"})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    # rejected before the conditional check, a cached listing is no excuse
+    last_modified = client.get("/publications").headers["Last-Modified"]
+    resp = client.get(
+        "/publications",
+        params={"fields": "content,password"},
+        headers={"If-Modified-Since": last_modified},
+    )
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_publications_fields_skip_joins():
+    stmt = get_publications_stmt("created_at", True, 10, frozenset({"content"}))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "votes" not in sql and "users" not in sql
+
+    stmt = get_publications_stmt("rating", True, 10, frozenset({"content"}))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "votes" in sql and "users" not in sql
+
+
+def test_get_publications_creators(client):
+    author = UserFactory()
+    PublicationFactory.create_batch(size=2, creator_id=author.id)
+    stmt = get_publications_stmt("created_at", True, 10)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "users" not in sql
+
+    resp = client.get("/publications", params={"order_by": "created_at"})
+    creators = [item["creator"] for item in resp.json()["details"]]
+    assert creators == [{"id": author.id, "username": author.username}] * 2
+    assert users_service._usernames == {author.id: author.username}
+
+    # repeat authors are served from the worker's cache
+    users_service._usernames[author.id] = "cached"
+    resp = client.get("/publications", params={"order_by": "created_at"})
+    usernames = {item["creator"]["username"] for item in resp.json()["details"]}
+    assert usernames == {"cached"}
+
+
+def test_get_publications_invalid_params(client):
+    resp = client.get("/publications", params={"q": "x" * 300})
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert resp.json()["detail"][0]["loc"] == ["query", "q"]
+
+
+def test_get_publications_excerpt(client, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLICATION_EXCERPT_LENGTH", 5)
+    long = PublicationFactory(content="é" * 20)
+    short = PublicationFactory(content="short")
+
+    resp = client.get("/publications", params={"order_by": "created_at"})
+    contents = {
+        item["id"]: (item["content"], item["truncated"])
+        for item in resp.json()["details"]
+    }
+    assert contents == {long.id: ("é" * 5, True), short.id: ("short", False)}
+
+    resp = client.get("/publications", params={"excerpt_length": 10})
+    assert {item["content"] for item in resp.json()["details"]} == {"é" * 10, "short"}
+
+    resp = client.get("/publications", params={"expand": "content"})
+    assert {item["content"] for item in resp.json()["details"]} == {"é" * 20, "short"}
+    assert not any(item["truncated"] for item in resp.json()["details"])
+
+    resp = client.get(f"/publications/{long.id}")
+    assert resp.json()["details"]["content"] == "é" * 20
+
+    user = UserFactory()
+    VoteFactory(publication_id=long.id, user_id=user.id)
+    credentials = UserFactory.get_credentials(user)
+    resp = client.get("/users/me/votes", headers={"Authorization": credentials})
+    publication = resp.json()["details"]["items"][0]["publication"]
+    assert (publication["content"], publication["truncated"]) == ("é" * 5, True)
@@ -0,0 +1,127 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.outbox.service import process_events
+from src.publications import use_case
+from src.users import tasks  # registers the outbox handler
+from src.users.service import refresh_user_stats
+from tests.factories import UserFactory
+from tests.factories.publication import PublicationFactory
+from tests.factories.vote import VoteFactory
+
+
+def test_get_my_votes_no_auth(client: TestClient) -> None:
+    resp = client.get("/users/me/votes")
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_get_my_votes_pages(client: TestClient) -> None:
+    user = UserFactory()
+    credentials = UserFactory.get_credentials(user)
+    publications = PublicationFactory.create_batch(size=3)
+    votes = [
+        VoteFactory(publication_id=publication.id, user_id=user.id, grade=i != 1)
+        for i, publication in enumerate(publications)
+    ]
+    VoteFactory(publication_id=publications[0].id, grade=False)  # someone else's
+
+    resp = client.get(
+        "/users/me/votes", params={"limit": 2}, headers={"Authorization": credentials}
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    page = resp.json()["details"]
+    assert [item["id"] for item in page["items"]] == [votes[2].id, votes[1].id]
+    assert page["items"][1]["grade"] is False
+    assert page["items"][1]["publication"]["id"] == publications[1].id
+    assert page["next_before"] == votes[1].id
+
+    resp = client.get(
+        "/users/me/votes",
+        params={"limit": 2, "before": page["next_before"]},
+        headers={"Authorization": credentials},
+    )
+    page = resp.json()["details"]
+    assert [item["id"] for item in page["items"]] == [votes[0].id]
+    assert page["items"][0]["publication"]["rating"] == 0
+    assert page["items"][0]["publication"]["vote_count"] == 2
+    assert page["next_before"] is None
+
+    resp = client.get(
+        "/users/me/votes", params={"limit": 0}, headers={"Authorization": credentials}
+    )
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_user_stats(client, db_sync_session, monkeypatch):
+    monkeypatch.setattr(settings, "USER_STATS_CACHE_SECONDS", 0)
+    author, voter = UserFactory(), UserFactory()
+    author_credentials = UserFactory.get_credentials(author)
+    voter_credentials = UserFactory.get_credentials(voter)
+    publication_ids = [
+        client.post(
+            "/publications", json={"content": "test"},
+            headers={"Authorization": author_credentials},
+        ).json()["details"]["id"]
+        for _ in range(2)
+    ]
+    for publication_id, grade in zip(publication_ids, (True, False)):
+        client.post(
+            f"/publications/{publication_id}/vote", json={"grade": grade},
+            headers={"Authorization": voter_credentials},
+        )
+
+    resp = client.get(f"/users/{author.id}/stats")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["details"] == {
+        "user_id": author.id, "publication_count": 0, "votes_received": 0, "rating": 0,
+        "last_publication": None,
+    }
+
+    process_events(db_sync_session, batch_size=10)
+    assert refresh_user_stats(db_sync_session)["full"] is True
+    stats = client.get(f"/users/{author.id}/stats").json()["details"]
+    assert (
+        stats["publication_count"], stats["votes_received"], stats["rating"]
+    ) == (2, 2, 0)
+    assert stats["last_publication"]["id"] == publication_ids[1]
+
+    # only creators with new events are recomputed
+    client.put(
+        f"/publications/{publication_ids[1]}/vote", json={"grade": True},
+        headers={"Authorization": voter_credentials},
+    )
+    process_events(db_sync_session, batch_size=10)
+    assert refresh_user_stats(db_sync_session) == {
+        "skipped": False, "full": False, "refreshed": 1
+    }
+    stats = client.get(f"/users/{author.id}/stats").json()["details"]
+    assert (stats["votes_received"], stats["rating"]) == (2, 2)
+
+    resp = client.get(f"/users/{voter.id + 100}/stats")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_user_publications(client, monkeypatch):
+    monkeypatch.setattr(use_case, "schedule_purge", lambda **kw: "task")
+    admin, author = UserFactory(is_admin=True), UserFactory()
+    PublicationFactory.create_batch(size=3, creator_id=author.id)
+    kept = PublicationFactory()
+    url = f"/users/{author.id}/publications"
+
+    as_admin = {"Authorization": UserFactory.get_credentials(admin)}
+    as_author = {"Authorization": UserFactory.get_credentials(author)}
+
+    resp = client.delete(url, headers=as_author)
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+    resp = client.delete(url, headers=as_admin)
+    assert resp.status_code == status.HTTP_202_ACCEPTED
+    assert resp.json()["details"] == {"deleted": 3, "task_id": "task"}
+    listed = client.get("/publications").json()["details"]
+    assert [item["id"] for item in listed] == [kept.id]
+
+    resp = client.delete(
+        f"/users/{kept.creator_id + 100}/publications", headers=as_admin
+    )
+    assert resp.status_code == status.HTTP_404_NOT_FOUND